@@ -0,0 +1,70 @@
+"""Time converting activities one model at a time against in bulk.
+
+Run from the repository root:
+
+    python -m benchmarks.activity_conversion [activities]
+"""
+
+import sys
+import timeit
+from models.models import ItineraryItem
+from utils.utils import (
+    activity_to_itinerary,
+    itinerary_to_activity,
+    activities_to_itineraries,
+    itineraries_to_activities,
+)
+
+
+def make_items(count: int):
+    return [
+        ItineraryItem(
+            title=f"Activity {index}",
+            transport=False,
+            start="09:00",
+            end="10:30",
+            description="A short walk between two of the city's sights.",
+            price=12.5,
+            theme="Culture",
+            transportMode="Walking",
+            requires_booking=False,
+            image_link=["https://example.com/1.jpg", "https://example.com/2"],
+            duration=90,
+            id=index,
+            latitude=51.5,
+            longitude=-0.12,
+        )
+        for index in range(count)
+    ]
+
+
+def report(name: str, function) -> None:
+    runs, total = timeit.Timer(function).autorange()
+    print(f"{name:>34}: {total / runs * 1000:.2f} ms")
+
+
+def main(count: int = 10_000) -> None:
+    items = make_items(count)
+    rows = itineraries_to_activities(items)
+    print(f"{count} activities")
+
+    report(
+        "itinerary_to_activity per item",
+        lambda: [itinerary_to_activity(item).model_dump() for item in items],
+    )
+    report(
+        "itineraries_to_activities",
+        lambda: itineraries_to_activities(items),
+    )
+    report(
+        "activity_to_itinerary per row",
+        lambda: [activity_to_itinerary(row) for row in rows],
+    )
+    report(
+        "activities_to_itineraries",
+        lambda: activities_to_itineraries(rows),
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,61 @@
+"""Time importing the app, as every worker does when it boots.
+
+Each run imports `main` in a fresh interpreter with `-X importtime` and
+reports the wall time and the slowest top-level imports. Importing must
+not open any connection; clients are created in the app lifespan. Run
+from the repository root:
+
+    python -m benchmarks.import_time [runs] [top]
+"""
+
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+def import_once(module: str = "main"):
+    """Wall time and cumulative microseconds per top-level import."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line[len("import time:") :].split("|")
+        # Nested imports are indented below the module importing them
+        if name.strip() and name[1:2] != " " and total.strip().isdigit():
+            cumulative[name.strip()] = int(total)
+    return elapsed, cumulative
+
+
+def main(runs: int = 5, top: int = 15) -> None:
+    walls = []
+    totals = defaultdict(list)
+    for _ in range(runs):
+        wall, cumulative = import_once()
+        walls.append(wall)
+        for name, micros in cumulative.items():
+            totals[name].append(micros)
+
+    print(
+        f"import main: best {min(walls) * 1000:.0f} ms, "
+        f"median {sorted(walls)[len(walls) // 2] * 1000:.0f} ms "
+        f"over {runs} runs (including interpreter start-up)"
+    )
+    slowest = sorted(
+        totals.items(), key=lambda item: min(item[1]), reverse=True
+    )
+    for name, micros in slowest[:top]:
+        print(f"{min(micros) / 1000:>9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,70 @@
+"""Time rendering a large GET /trips payload with each response class.
+
+Run from the repository root:
+
+    python -m benchmarks.json_serialization [trips] [activities_per_trip]
+"""
+
+import sys
+import timeit
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from models.models import ItineraryItem
+
+
+def trips_payload(trip_count: int, activities_per_trip: int) -> dict:
+    """A response shaped like GET /trips for a heavy user."""
+    trips = []
+    for trip in range(trip_count):
+        itinerary = [
+            ItineraryItem(
+                title=f"Activity {activity}",
+                transport=activity % 2 == 1,
+                start="09:00",
+                end="10:30",
+                description="A short walk between two of the city's sights.",
+                price=12.5,
+                theme="Culture",
+                transportMode="Walking",
+                requires_booking=False,
+                image_link=[f"https://example.com/{trip}/{activity}.jpg"],
+                duration=90,
+                id=activity,
+                latitude=51.5 + activity / 1000,
+                longitude=-0.12 - activity / 1000,
+            )
+            for activity in range(activities_per_trip)
+        ]
+        trips.append(
+            {
+                "trip_id": f"00000000-0000-0000-0000-{trip:012d}",
+                "city": "London",
+                "custom_name": "Trip to London",
+                "date_created": "2025-01-01",
+                "time_of_day": "Morning,Afternoon",
+                "timeOfDay": ["Morning", "Afternoon"],
+                "group": "Family",
+                "itinerary": itinerary,
+            }
+        )
+    return {"user_id": "user-1", "trips": trips}
+
+
+def main(trip_count: int = 200, activities_per_trip: int = 12) -> None:
+    # FastAPI runs jsonable_encoder before either response class renders
+    content = jsonable_encoder(trips_payload(trip_count, activities_per_trip))
+    size = len(ORJSONResponse(content).body)
+    print(
+        f"{trip_count} trips x {activities_per_trip} activities, "
+        f"{size / 1024:.0f} KiB"
+    )
+
+    for response_class in (JSONResponse, ORJSONResponse):
+        runs, total = timeit.Timer(
+            lambda: response_class(content)
+        ).autorange()
+        print(f"{response_class.__name__:>15}: {total / runs * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,126 @@
+"""Count Supabase round trips for GET /trips as the number of trips grows.
+
+Compares fetching each trip's activities with its own query, as GET
+/trips used to, against the batched query it makes now. Supabase is
+replaced by an in-memory table that adds a fixed latency per round
+trip. Run from the repository root:
+
+    python -m benchmarks.trips_round_trips [latency_ms]
+"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+from benchmarks.activity_conversion import make_items
+from routes import saving
+from utils.database import TripsRepository
+from utils.trip_cache import MemoryTripStore, TripCache
+from utils.utils import itineraries_to_activities
+
+USER_ID = "user-1"
+ACTIVITIES_PER_TRIP = 8
+
+
+class Query:
+    """The subset of the postgrest query builder GET /trips uses."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+
+    def select(self, columns="*"):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    async def execute(self):
+        self.db.round_trips += 1
+        await asyncio.sleep(self.db.latency)
+        rows = [
+            dict(row)
+            for row in self.db.rows[self.table]
+            if all(match(row) for match in self.filters)
+        ]
+        return SimpleNamespace(data=rows)
+
+
+class Database:
+    def __init__(self, trip_count: int, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+        self.rows = {"trips": [], "activities": []}
+        items = make_items(ACTIVITIES_PER_TRIP)
+        activities = itineraries_to_activities(items)
+        for index in range(trip_count):
+            trip_id = f"00000000-0000-0000-0000-{index:012d}"
+            self.rows["trips"].append(
+                {
+                    "trip_id": trip_id,
+                    "user_id": USER_ID,
+                    "city": "London",
+                    "date_created": "2025-01-01",
+                    "time_of_day": "Morning,Evening",
+                }
+            )
+            self.rows["activities"].extend(
+                dict(activity, trip_id=trip_id) for activity in activities
+            )
+
+    def table(self, name):
+        return Query(self, name)
+
+
+async def one_query_per_trip(repository: TripsRepository) -> None:
+    """The previous GET /trips: list the trips, then query each one."""
+    trips = await repository.list_trips(USER_ID)
+    for trip in trips:
+        await repository.get_activities(trip["trip_id"])
+
+
+async def batched(repository: TripsRepository) -> None:
+    """GET /trips as it is now, with the response cache off."""
+    with patch.object(
+        saving, "get_repository", return_value=repository
+    ), patch.object(
+        saving,
+        "get_trip_cache",
+        return_value=TripCache(MemoryTripStore(1), ttl=0),
+    ):
+        await saving.get_trips(user_id=USER_ID)
+
+
+async def measure(load, trip_count: int, latency: float):
+    db = Database(trip_count, latency)
+    start = time.perf_counter()
+    await load(TripsRepository(db))
+    return db.round_trips, (time.perf_counter() - start) * 1000
+
+
+async def main(latency_ms: float = 5) -> None:
+    latency = latency_ms / 1000
+    print(f"{latency_ms:g} ms per round trip")
+    print(f"{'trips':>6} {'one query per trip':>23} {'batched':>23}")
+    for trip_count in (1, 10, 50, 100, 250):
+        before = await measure(one_query_per_trip, trip_count, latency)
+        after = await measure(batched, trip_count, latency)
+        print(
+            f"{trip_count:>6}"
+            + "".join(
+                f" {round_trips:>5} calls {elapsed:>7.1f} ms"
+                for round_trips, elapsed in (before, after)
+            )
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(float(arg) for arg in sys.argv[1:2])))
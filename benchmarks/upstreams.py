@@ -0,0 +1,200 @@
+"""Local stand-ins for every upstream the API talks to, for load tests.
+
+One app serves all of them under separate prefixes:
+
+    /backend   BACKEND_URL (POST /activities, POST /itinerary)
+    /auth      AUTH_URL (GET /validate)
+    /supabase  PROJECT_URL (PostgREST tables and RPC functions)
+    /google    GOOGLE_DIRECTIONS_URL (GET /directions/json)
+
+Each upstream sleeps for a configurable latency, in seconds, before it
+answers: STUB_BACKEND_LATENCY, STUB_AUTH_LATENCY, STUB_SUPABASE_LATENCY
+and STUB_GOOGLE_LATENCY. STUB_TRIPS sets how many saved trips each user
+has and STUB_ACTIVITIES_PER_TRIP how many activities each of them holds.
+
+Run on its own with:
+
+    uvicorn benchmarks.upstreams:app --port 5100
+"""
+
+import asyncio
+import os
+import re
+import uuid
+import polyline
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+
+LATENCY = {
+    name: float(os.getenv(f"STUB_{name.upper()}_LATENCY", "0"))
+    for name in ("backend", "auth", "supabase", "google")
+}
+TRIPS_PER_USER = int(os.getenv("STUB_TRIPS", "20"))
+ACTIVITIES_PER_TRIP = int(os.getenv("STUB_ACTIVITIES_PER_TRIP", "8"))
+
+# A route of a few hundred points, like a short city transit journey
+POLYLINE = polyline.encode(
+    [
+        (51.5 + index * 1e-4, -0.12 + (index % 7 - 3) * 1e-4)
+        for index in range(300)
+    ]
+)
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+
+async def delay(upstream: str) -> None:
+    if LATENCY[upstream] > 0:
+        await asyncio.sleep(LATENCY[upstream])
+
+
+def itinerary_item(index: int) -> dict:
+    return {
+        "title": f"Activity {index}",
+        "transport": index % 2 == 1,
+        "start": "09:00",
+        "end": "10:30",
+        "description": "A short walk between two of the city's sights.",
+        "price": 12.5,
+        "theme": "Culture",
+        "transportMode": "Walking",
+        "requires_booking": False,
+        "image_link": [f"https://example.com/{index}.jpg"],
+        "duration": 90,
+        "id": index,
+        "latitude": 51.5 + index / 1000,
+        "longitude": -0.12 - index / 1000,
+    }
+
+
+def trip_id(user_id: str, index: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{user_id}/{index}"))
+
+
+def trip_row(user_id: str, index: int) -> dict:
+    return {
+        "trip_id": trip_id(user_id, index),
+        "user_id": user_id,
+        "city": "London",
+        "custom_name": f"Trip {index}",
+        "date_of_trip": None,
+        "date_created": f"2025-01-{index % 28 + 1:02d}",
+        "time_of_day": "Morning,Afternoon",
+        "group": "Solo",
+    }
+
+
+def activity_row(trip: str, index: int) -> dict:
+    return {
+        "trip_id": trip,
+        "title": f"Activity {index}",
+        "start": "09:00",
+        "end": "10:30",
+        "description": "A short walk between two of the city's sights.",
+        "price": 12.5,
+        "theme": "Culture",
+        "transport_mode": "Walking",
+        "transport": index % 2 == 1,
+        "requires_booking": False,
+        "image_link": f"https://example.com/{index}.jpg",
+        "duration": 90,
+        "weather": None,
+        "temperature": None,
+        "id": index,
+        "booking_url": None,
+        "longitude": -0.12 - index / 1000,
+        "latitude": 51.5 + index / 1000,
+    }
+
+
+# Backend
+@app.post("/backend/activities")
+async def activities(request: Request):
+    await request.body()
+    await delay("backend")
+    return {"activities": [itinerary_item(index) for index in range(20)]}
+
+
+@app.post("/backend/itinerary")
+async def itinerary(request: Request):
+    await request.body()
+    await delay("backend")
+    return {"itinerary": [itinerary_item(index) for index in range(10)]}
+
+
+# Auth service
+@app.get("/auth/validate")
+async def validate(request: Request):
+    await delay("auth")
+    token = request.cookies.get("token", "")
+    if not token.startswith("bench-token-"):
+        return ORJSONResponse({"detail": "Invalid token"}, status_code=401)
+    return {"user_id": "bench-user-" + token[len("bench-token-"):]}
+
+
+# Supabase PostgREST; only the filters the repository sends are understood
+def _filter_value(request: Request, column: str) -> str:
+    value = request.query_params.get(column, "")
+    return value.split(".", 1)[1] if "." in value else value
+
+
+@app.get("/supabase/rest/v1/trips")
+async def select_trips(request: Request):
+    await delay("supabase")
+    user_id = _filter_value(request, "user_id")
+    rows = [trip_row(user_id, index) for index in range(TRIPS_PER_USER)]
+    rows.sort(key=lambda row: (row["date_created"], row["trip_id"]))
+    rows.reverse()
+    if "limit" in request.query_params:
+        rows = rows[: int(request.query_params["limit"])]
+    return rows
+
+
+@app.get("/supabase/rest/v1/activities")
+async def select_activities(request: Request):
+    await delay("supabase")
+    condition = _filter_value(request, "trip_id")
+    trip_ids = re.findall(r"[0-9a-f-]{36}", condition)
+    return [
+        activity_row(trip, index)
+        for trip in trip_ids
+        for index in range(ACTIVITIES_PER_TRIP)
+    ]
+
+
+@app.post("/supabase/rest/v1/rpc/{function}")
+async def rpc(function: str, request: Request):
+    await request.body()
+    await delay("supabase")
+    if function == "save_trip":
+        return str(uuid.uuid4())
+    return True
+
+
+# Google Directions API
+@app.get("/google/directions/json")
+async def directions(request: Request):
+    await delay("google")
+    step = {
+        "transit_details": {
+            "line": {"short_name": "24", "vehicle": {"type": "BUS"}},
+            "departure_time": {"text": "09:05"},
+        }
+    }
+    return {
+        "status": "OK",
+        "routes": [
+            {
+                "summary": f"Route {index}",
+                "overview_polyline": {"points": POLYLINE},
+                "legs": [
+                    {
+                        "duration": {"text": "25 mins"},
+                        "distance": {"value": 5200 + index * 300},
+                        "steps": [step, {}, step],
+                    }
+                ],
+            }
+            for index in range(3)
+        ],
+    }
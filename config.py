@@ -1,12 +1,135 @@
-"""Configuration for the Travelator Database API."""
+"""Configuration for the Travelator Database API.
 
-from dotenv import load_dotenv
-import os
+Every setting is read once, from the environment or a `.env` file next to
+this module, into a cached Settings object. Environment variables take
+precedence over `.env`. Settings are also available as module attributes,
+so `from config import BACKEND_URL` keeps working.
+"""
 
-# Load environment variables
-load_dotenv()
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-# API Configuration
-BACKEND_URL = os.getenv("BACKEND_URL")
-PORT = int(os.getenv("PORT", "5000"))
+# Upper bound in seconds for a forwarded backend request
 MAX_TIMEOUT = 120
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file=Path(__file__).parent / ".env", extra="ignore"
+    )
+
+    # API Configuration
+    BACKEND_URL: Optional[str] = None
+    PORT: int = 5000
+
+    # Production server (server.py). WEB_CONCURRENCY=0 runs one worker per
+    # available CPU; each worker has its own connection pools and caches
+    HOST: str = "0.0.0.0"
+    WEB_CONCURRENCY: int = 0
+    # Seconds to let in-flight requests finish on shutdown, long enough for
+    # a forwarded request to reach MAX_TIMEOUT
+    GRACEFUL_SHUTDOWN_TIMEOUT: float = MAX_TIMEOUT
+
+    # Supabase project holding saved trips
+    SUPABASE_URL: Optional[str] = Field(None, validation_alias="PROJECT_URL")
+    SUPABASE_KEY: Optional[str] = Field(None, validation_alias="API_KEY")
+
+    # Admission control for forwarded backend requests, per worker. Past
+    # BACKEND_MAX_CONCURRENCY requests wait in a queue of at most
+    # BACKEND_MAX_QUEUE for up to BACKEND_QUEUE_TIMEOUT seconds, then get a
+    # 503. BACKEND_RESERVED_CONCURRENCY slots are kept for /activities
+    BACKEND_MAX_CONCURRENCY: int = 64
+    BACKEND_RESERVED_CONCURRENCY: int = 8
+    BACKEND_MAX_QUEUE: int = 256
+    BACKEND_QUEUE_TIMEOUT: float = 10
+
+    # Circuit breakers for the backend and the auth service. A breaker opens
+    # once BREAKER_FAILURE_RATE of the last BREAKER_WINDOW calls failed, or
+    # BREAKER_SLOW_CALL_RATE of them took longer than the upstream's slow
+    # call threshold, and refuses calls for BREAKER_OPEN_SECONDS before
+    # letting BREAKER_HALF_OPEN_CALLS probes through
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_SLOW_CALL_RATE: float = 0.8
+    BREAKER_MIN_CALLS: int = 20
+    BREAKER_WINDOW: int = 50
+    BREAKER_OPEN_SECONDS: float = 30
+    BREAKER_HALF_OPEN_CALLS: int = 3
+    BACKEND_SLOW_CALL_SECONDS: float = 60
+    AUTH_SLOW_CALL_SECONDS: float = 2
+
+    # Hedge idempotent GETs: if no answer has arrived after the upstream's
+    # HEDGE_QUANTILE latency, send a second attempt and use the first reply
+    HEDGE_REQUESTS: bool = False
+    HEDGE_QUANTILE: float = 0.95
+    HEDGE_MIN_DELAY: float = 0.05
+
+    # Outbound HTTP connection pool
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30
+    HTTP2_ENABLED: bool = False
+
+    # Stream forwarded requests instead of buffering them, per route
+    STREAM_ACTIVITIES: bool = False
+    STREAM_ITINERARY: bool = False
+    STREAM_DEFAULT: bool = False
+
+    # Response cache for /activities, disabled when the TTL is 0
+    ACTIVITIES_CACHE_TTL: float = 900
+    ACTIVITIES_CACHE_MAX_ENTRIES: int = 1024
+    ACTIVITIES_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Token validation against the auth service, cached per token
+    AUTH_URL: Optional[str] = None
+    AUTH_CACHE_TTL: float = 60
+    AUTH_NEGATIVE_CACHE_TTL: float = 10
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+
+    # Directions cache; coordinates are rounded to DIRECTIONS_CACHE_PRECISION
+    # decimal places and DIRECTIONS_CACHE_PATH enables the SQLite tier, which
+    # keeps the DIRECTIONS_DISK_CACHE_MAX_ENTRIES most recently written routes
+    DIRECTIONS_CACHE_TTL: float = 86400
+    DIRECTIONS_TRANSIT_CACHE_TTL: float = 300
+    DIRECTIONS_CACHE_PRECISION: int = 4
+    DIRECTIONS_CACHE_MAX_ENTRIES: int = 4096
+    DIRECTIONS_CACHE_PATH: str = ""
+    DIRECTIONS_DISK_CACHE_MAX_ENTRIES: int = 100_000
+
+    # Google Directions API client
+    GOOGLE_MAPS_API_KEY: Optional[str] = None
+    GOOGLE_DIRECTIONS_URL: str = (
+        "https://maps.googleapis.com/maps/api/directions/json"
+    )
+    DIRECTIONS_TIMEOUT: float = 10
+    DIRECTIONS_MAX_RETRIES: int = 2
+    DIRECTIONS_RETRY_BACKOFF: float = 0.25
+    DIRECTIONS_MAX_CONCURRENCY: int = 20
+
+    # JSON file with fares for more cities, merged over the built-in tables
+    FARES_PATH: str = ""
+
+    # Default Douglas-Peucker tolerance in metres for route polylines, 0 = off
+    POLYLINE_SIMPLIFY_TOLERANCE: float = 0
+
+    # Per-user cache of GET /trips responses, disabled when the TTL is 0.
+    # TRIP_CACHE_URL points it at a Redis-compatible server instead of memory,
+    # which server.py requires to run the cache with more than one worker
+    TRIP_CACHE_TTL: float = 300
+    TRIP_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    TRIP_CACHE_URL: str = ""
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The settings, read from the environment on first use."""
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Module attributes fall through to the cached settings
+    if name in Settings.model_fields:
+        return getattr(get_settings(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routes import activities, itinerary, default, saving, map
+from routes import activities, itinerary, default, saving, map, stats
 from config import PORT
-from dotenv import load_dotenv
+from utils.http_client import start_client, close_client
+from utils.database import start_repository, close_repository
+from utils.metrics import MetricsMiddleware
+from utils.trip_cache import start_trip_cache, close_trip_cache
 
 
-# Load environment variables
-load_dotenv(override=True)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared outbound clients on startup and close them on shutdown.
+
+    Nothing connects at import time, so each worker opens its own
+    clients here after it starts.
+    """
+    await start_client()
+    await start_repository()
+    await start_trip_cache()
+    yield
+    await close_trip_cache()
+    await map.directions_cache.close()
+    await close_repository()
+    await close_client()
+
 
 # Create FastAPI app
-app = FastAPI(title="Travelator Database API")
+app = FastAPI(
+    title="Travelator Database API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Configure CORS
 origins = [
@@ -25,13 +48,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Added last so it is outermost and times CORS handling as well
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(activities.router)
 app.include_router(itinerary.router)
 app.include_router(saving.router)
 app.include_router(map.router)
+app.include_router(stats.router)
 app.include_router(default.router)
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from typing_extensions import TypedDict
 
 
 class ItineraryItem(BaseModel):
@@ -51,12 +52,65 @@ class ItineraryItem(BaseModel):
     )
 
 
+class ItineraryItemDict(TypedDict):
+    """An ItineraryItem as a plain dict, validated without a model."""
+
+    title: str
+    transport: bool
+    start: str
+    end: str
+    description: str
+    price: float
+    theme: str
+    transportMode: str
+    requires_booking: bool
+    booking_url: Optional[str]
+    weather: Optional[str]
+    temperature: Optional[int]
+    image_link: List[str]
+    duration: int
+    id: int
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+
 class FullItinerary(BaseModel):
     itinerary: list[ItineraryItem] = Field(
         description="A full day itinerary for the given location"
     )
 
 
+class ItineraryItemPatch(BaseModel):
+    """Changes to one itinerary item, matched on its id.
+
+    Only the fields that are set are applied. Items whose id is not in the
+    stored itinerary are added and must then be complete.
+    """
+
+    id: int
+    title: Optional[str] = None
+    transport: Optional[bool] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    theme: Optional[str] = None
+    transportMode: Optional[str] = None
+    requires_booking: Optional[bool] = None
+    booking_url: Optional[str] = None
+    weather: Optional[str] = None
+    temperature: Optional[int] = None
+    image_link: Optional[List[str]] = None
+    duration: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class ItineraryPatch(BaseModel):
+    items: List[ItineraryItemPatch] = []
+    removed: List[int] = []
+
+
 class Activity(BaseModel):
     title: str
     start: str
@@ -91,6 +145,10 @@ class TripRequest(BaseModel):
     activities: List[Activity]
 
 
+class BulkTripRequest(BaseModel):
+    trips: List[TripRequest] = Field(min_length=1, max_length=100)
+
+
 class TripUpdateRequest(BaseModel):
     trip: Trip
     activities: Optional[List[Activity]] = None
@@ -102,8 +160,21 @@ class DirectionsRequest(BaseModel):
     mode: str = (
         "transit"  # Default to transit (options: driving, walking, transit)
     )
+    city: Optional[str] = None  # Adds a fare estimate to each route
+
+
+class FareLeg(BaseModel):
+    city: Optional[str] = None
+    mode: str = "transit"
+    distance_km: float = 0.0
+    transit_steps: list[dict] = []  # As returned by /get-directions
+
+
+class FareRequest(BaseModel):
+    legs: list[FareLeg]
 
 
 class ItineraryRequest(BaseModel):
     city: str
     itinerary: list[dict]  # List of places with names & locations
+    mode: str = "transit"  # Used for legs without a transport step
@@ -1,15 +1,96 @@
-from fastapi import APIRouter, Request
-from config import BACKEND_URL
+from typing import Optional
+from fastapi import APIRouter, Request, Response
+import orjson
+from config import (
+    BACKEND_URL,
+    STREAM_ACTIVITIES,
+    ACTIVITIES_CACHE_TTL,
+    ACTIVITIES_CACHE_MAX_ENTRIES,
+    ACTIVITIES_CACHE_MAX_BYTES,
+)
+from utils.admission import HIGH
+from utils.cache import TTLCache
 from .request_forwarder import forward_request
 
 router = APIRouter()
 
+activities_cache = TTLCache(
+    name="activities",
+    ttl=ACTIVITIES_CACHE_TTL,
+    max_entries=ACTIVITIES_CACHE_MAX_ENTRIES,
+    max_bytes=ACTIVITIES_CACHE_MAX_BYTES,
+)
+
+
+def activities_cache_key(body: bytes, query: str = "") -> Optional[bytes]:
+    """Normalize an activities request so equivalent searches share a key."""
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+
+    if not isinstance(data, dict):
+        return None
+
+    normalized = dict(data)
+    normalized["city"] = str(data.get("city") or "").strip().casefold()
+    time_of_day = data.get("timeOfDay") or []
+    if isinstance(time_of_day, list):
+        normalized["timeOfDay"] = sorted(str(time) for time in time_of_day)
+
+    return orjson.dumps([normalized, query], option=orjson.OPT_SORT_KEYS)
+
+
+def _response_size(response: Response) -> int:
+    return len(response.body) + sum(
+        len(name) + len(value) for name, value in response.headers.items()
+    )
+
+
+def _is_cacheable(response: Response) -> bool:
+    # Never share a response that sets a cookie for one particular user
+    return (
+        response.status_code == 200 and "set-cookie" not in response.headers
+    )
+
 
 @router.post("/activities")
 async def activities(request: Request):
     """Handle activities endpoint."""
-    return await forward_request(
-        request=request,
-        method="post",
-        url=f"{BACKEND_URL}/activities",
+    url = f"{BACKEND_URL}/activities"
+    key = None
+    if ACTIVITIES_CACHE_TTL > 0:
+        key = activities_cache_key(
+            await request.body(), str(request.query_params)
+        )
+
+    if key is None:
+        return await forward_request(
+            request=request,
+            method="post",
+            url=url,
+            stream=STREAM_ACTIVITIES,
+            priority=HIGH,
+        )
+
+    cached = activities_cache.get(key)
+    cache_status = "HIT"
+    if cached is None:
+        cache_status = "MISS"
+        # Cached responses have to be buffered, so misses are never streamed
+        cached = await activities_cache.load(
+            key,
+            lambda: forward_request(
+                request=request, method="post", url=url, priority=HIGH
+            ),
+            size_of=_response_size,
+            cacheable=_is_cacheable,
+        )
+
+    headers = dict(cached.headers)
+    headers["X-Cache"] = cache_status
+    return Response(
+        content=cached.body,
+        status_code=cached.status_code,
+        headers=headers,
     )
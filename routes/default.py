@@ -1,17 +1,27 @@
 from fastapi import APIRouter, Request, HTTPException
-from config import BACKEND_URL
+from config import BACKEND_URL, STREAM_DEFAULT
 from .request_forwarder import forward_request
 
 router = APIRouter()
 
+# Paths served by this service itself that must never be forwarded
+LOCAL_PATHS = frozenset(
+    {
+        "get-directions",
+        "get-itinerary-directions",
+        "estimate-fares",
+        "metrics",
+    }
+)
+
 
 @router.api_route(
     "/{path_name:path}", methods=["GET", "POST", "PUT", "DELETE"]
 )
 async def catch_all(request: Request, path_name: str):
     """Catch all route that forwards the request."""
-    # Exclude /get-directions from being forwarded
-    if path_name == "get-directions":
+    # Exclude local endpoints such as /get-directions from being forwarded
+    if path_name in LOCAL_PATHS:
         raise HTTPException(status_code=404, detail="Not Found")
 
     url = f"{BACKEND_URL}/{path_name}"
@@ -19,4 +29,5 @@ async def catch_all(request: Request, path_name: str):
         request=request,
         method=request.method.lower(),
         url=url,
+        stream=STREAM_DEFAULT,
     )
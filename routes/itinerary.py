@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Request
-from config import BACKEND_URL
+from config import BACKEND_URL, STREAM_ITINERARY
+from utils.admission import LOW
 from .request_forwarder import forward_request
 
 router = APIRouter()
@@ -7,9 +8,15 @@ router = APIRouter()
 
 @router.post("/itinerary")
 async def itinerary(request: Request):
-    """Handle itinerary endpoint."""
+    """Handle itinerary endpoint.
+
+    Generating an itinerary is slow, so it yields to other backend calls
+    when the backend is busy.
+    """
     return await forward_request(
         request=request,
         method="post",
         url=f"{BACKEND_URL}/itinerary",
+        stream=STREAM_ITINERARY,
+        priority=LOW,
     )
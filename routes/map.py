@@ -1,63 +1,92 @@
-from fastapi import APIRouter
-import requests
-import polyline
-import os
-from models.models import DirectionsRequest
+import asyncio
+import logging
+from functools import lru_cache
+from fastapi import APIRouter, Query
+from typing import TYPE_CHECKING, Annotated, Literal, Optional
+from models.models import DirectionsRequest, FareRequest, ItineraryRequest
+from config import (
+    DIRECTIONS_CACHE_TTL,
+    DIRECTIONS_TRANSIT_CACHE_TTL,
+    DIRECTIONS_CACHE_PRECISION,
+    DIRECTIONS_CACHE_MAX_ENTRIES,
+    DIRECTIONS_CACHE_PATH,
+    DIRECTIONS_DISK_CACHE_MAX_ENTRIES,
+    FARES_PATH,
+    GOOGLE_MAPS_API_KEY,
+    POLYLINE_SIMPLIFY_TOLERANCE,
+)
+from utils.directions_cache import DirectionsCache
+from utils.directions_client import fetch_directions
+
+# utils.fares and utils.polylines pull in numpy, so they are imported on
+# first use rather than while every worker boots
+if TYPE_CHECKING:
+    from utils.fares import FareTables
 
 # Create a router
 router = APIRouter()
 
-# Google Maps API Key (Replace with your actual API key)
-GOOGLE_MAPS_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+logger = logging.getLogger(__name__)
+
+directions_cache = DirectionsCache(
+    ttl=DIRECTIONS_CACHE_TTL,
+    transit_ttl=DIRECTIONS_TRANSIT_CACHE_TTL,
+    precision=DIRECTIONS_CACHE_PRECISION,
+    max_entries=DIRECTIONS_CACHE_MAX_ENTRIES,
+    path=DIRECTIONS_CACHE_PATH or None,
+    disk_max_entries=DIRECTIONS_DISK_CACHE_MAX_ENTRIES,
+)
+
+
+@lru_cache(maxsize=None)
+def get_fare_tables() -> "FareTables":
+    """Fare tables, read from FARES_PATH on first use."""
+    from utils.fares import FareTables
+
+    return FareTables.load(FARES_PATH or None)
 
-# Taxi fare data
-TAXI_FARES = {
-    "New York City": {"base_fare": 3.00, "per_km": 1.50},
-    "London": {"base_fare": 3.20, "per_km": 2.00},
-    "San Francisco": {"base_fare": 3.50, "per_km": 2.25},
-}
 
-# Public transport fare data
-PUBLIC_TRANSIT_FARES = {
-    "New York City": {"bus": 2.75, "subway": 2.75},
-    "London": {"bus": 1.75, "subway": 2.40},
-    "San Francisco": {"bus": 3.00, "subway": 3.50},
+# Itinerary transportMode values that map onto a Directions API mode
+TRANSPORT_MODES = {
+    "Walking": "walking",
+    "Taxi": "driving",
+    "Bus": "transit",
+    "Tube": "transit",
+    "Train": "transit",
+    "Ferry": "transit",
 }
 
 
 # Google Directions API - Fetch Route Data
-def get_google_directions(origin, destination, mode="transit"):
-    print(f"Getting directions from {origin} to {destination}, mode: {mode}")
+async def get_google_directions(origin, destination, mode="transit"):
+    logger.debug(
+        "Getting directions from %s to %s, mode: %s", origin, destination, mode
+    )
 
-    url = "https://maps.googleapis.com/maps/api/directions/json"
     params = {
         "origin": f"{origin[0]},{origin[1]}",
         "destination": f"{destination[0]},{destination[1]}",
         "mode": mode,
         "departure_time": "now",
-        "key": GOOGLE_MAPS_KEY,
+        "key": GOOGLE_MAPS_API_KEY,
     }
 
-    print(f"Google API request params: {params}")
-
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
-
-        if data.get("status") != "OK":
-            return None
+        data = await fetch_directions(params)
 
-        print(f"Google API response status: {data.get('status')}")
         if data.get("status") != "OK":
-            print(
-                f"Error message: {data.get('error_message', 'No specific error message')}"
+            logger.debug(
+                "Google API response status: %s, %s",
+                data.get("status"),
+                data.get("error_message", "no error message"),
             )
+            return None
 
         routes = []
         for route in data["routes"]:
             legs = route["legs"][0]
+            # Kept encoded until the response format is known
             polyline_data = route["overview_polyline"]["points"]
-            decoded_polyline = polyline.decode(polyline_data)
             duration = legs["duration"]["text"]
             distance_km = (
                 legs["distance"]["value"] / 1000
@@ -84,7 +113,7 @@ def get_google_directions(origin, destination, mode="transit"):
 
             routes.append(
                 {
-                    "polyline": decoded_polyline,
+                    "encoded_polyline": polyline_data,
                     "duration": duration,
                     "summary": summary,
                     "distance_km": distance_km,
@@ -95,17 +124,190 @@ def get_google_directions(origin, destination, mode="transit"):
         return routes
 
     except Exception as e:
-        print(f"Error fetching directions: {e}")
+        logger.warning("Error fetching directions: %s", e)
         return None
 
 
+async def get_cached_directions(origin, destination, mode):
+    """Routes between two points, served from the cache when possible."""
+    key = directions_cache.key(origin, destination, mode)
+    route_data = await directions_cache.get(key)
+    if route_data is None:
+        route_data = await get_google_directions(origin, destination, mode)
+        if route_data:
+            await directions_cache.set(key, route_data)
+    return route_data
+
+
+def format_routes(route_data, polyline_format, tolerance):
+    """Copies of the routes with their polyline in the requested format."""
+    from utils.polylines import format_polyline
+
+    formatted = []
+    for route in route_data:
+        route = dict(route)
+        encoded = route.pop("encoded_polyline", None)
+        if encoded is not None:
+            route["polyline"] = format_polyline(
+                encoded, polyline_format, tolerance
+            )
+        formatted.append(route)
+    return formatted
+
+
+def place_location(place):
+    """[latitude, longitude] of an itinerary place, or None if unknown."""
+    location = place.get("location")
+    if isinstance(location, dict):
+        location = [location.get("latitude"), location.get("longitude")]
+    if location is None:
+        location = [place.get("latitude"), place.get("longitude")]
+    if not isinstance(location, (list, tuple)) or len(location) != 2:
+        return None
+    if any(
+        not isinstance(coord, (int, float)) for coord in location
+    ):
+        return None
+    return list(location)
+
+
+def itinerary_legs(request: ItineraryRequest):
+    """Consecutive pairs of places that have a location.
+
+    Transport steps are not places. The first transport step between two
+    places with a known transportMode sets the mode of that leg.
+    """
+    legs = []
+    previous = None
+    step_mode = None
+    for item in request.itinerary:
+        if item.get("transport"):
+            if step_mode is None:
+                step_mode = TRANSPORT_MODES.get(
+                    item.get("transportMode") or item.get("transport_mode")
+                )
+            continue
+        location = place_location(item)
+        if location is None:
+            continue
+        if previous is not None:
+            start, origin = previous
+            mode = step_mode or request.mode
+            legs.append((start, item, origin, location, mode))
+        previous = (item, location)
+        step_mode = None
+    return legs
+
+
+# Query parameters choosing how polylines are returned. `simplify` is a
+# Douglas-Peucker tolerance in metres
+PolylineFormat = Annotated[Literal["decoded", "encoded"], Query()]
+SimplifyTolerance = Annotated[Optional[float], Query(ge=0, le=1000)]
+
+
 # API Endpoint: Get Directions
 @router.post("/get-directions")
-def get_directions(request: DirectionsRequest):
-    route_data = get_google_directions(
+async def get_directions(
+    request: DirectionsRequest,
+    polyline_format: PolylineFormat = "decoded",
+    simplify: SimplifyTolerance = None,
+):
+    route_data = await get_cached_directions(
         request.origin, request.destination, request.mode
     )
     if not route_data:
         return {"error": "No route found"}
 
+    if simplify is None:
+        simplify = POLYLINE_SIMPLIFY_TOLERANCE
+    route_data = format_routes(route_data, polyline_format, simplify)
+
+    if request.city:
+        from utils.fares import estimate_leg_fares
+
+        fares = estimate_leg_fares(
+            get_fare_tables(),
+            [
+                dict(route, city=request.city, mode=request.mode)
+                for route in route_data
+            ],
+        )
+        route_data = [
+            dict(route, fare=fare) for route, fare in zip(route_data, fares)
+        ]
+
     return {"routes": route_data}
+
+
+# API Endpoint: Get Directions for every leg of an itinerary
+@router.post("/get-itinerary-directions")
+async def get_itinerary_directions(
+    request: ItineraryRequest,
+    polyline_format: PolylineFormat = "decoded",
+    simplify: SimplifyTolerance = None,
+):
+    legs = itinerary_legs(request)
+    if simplify is None:
+        simplify = POLYLINE_SIMPLIFY_TOLERANCE
+
+    # Repeated pairs, e.g. returning to the hotel, are only fetched once
+    lookups = {}
+    for _, _, origin, destination, mode in legs:
+        key = directions_cache.key(origin, destination, mode)
+        if key not in lookups:
+            lookups[key] = get_cached_directions(origin, destination, mode)
+    results = dict(
+        zip(
+            lookups,
+            await asyncio.gather(*lookups.values(), return_exceptions=True),
+        )
+    )
+
+    response_legs = []
+    routed_legs = []
+    for start, end, origin, destination, mode in legs:
+        leg = {
+            "from": start.get("name") or start.get("title"),
+            "to": end.get("name") or end.get("title"),
+            "origin": origin,
+            "destination": destination,
+            "mode": mode,
+        }
+        route_data = results[directions_cache.key(origin, destination, mode)]
+        if isinstance(route_data, Exception) or not route_data:
+            # One failed leg should not hide the directions for the others
+            leg["error"] = "No route found"
+        else:
+            leg["routes"] = format_routes(
+                route_data, polyline_format, simplify
+            )
+            # The first route is the one Google recommends
+            routed_legs.append(
+                dict(route_data[0], city=request.city, mode=mode)
+            )
+        response_legs.append(leg)
+
+    from utils.fares import estimate_leg_fares, total_fare
+
+    fares = estimate_leg_fares(get_fare_tables(), routed_legs)
+    for leg, fare in zip(
+        (leg for leg in response_legs if "routes" in leg), fares
+    ):
+        leg["fare"] = fare
+
+    return {
+        "city": request.city,
+        "legs": response_legs,
+        "total_fare": total_fare(fares),
+    }
+
+
+# API Endpoint: Estimate fares for many legs at once
+@router.post("/estimate-fares")
+async def estimate_fares(request: FareRequest):
+    from utils.fares import estimate_leg_fares, total_fare
+
+    fares = estimate_leg_fares(
+        get_fare_tables(), [leg.model_dump() for leg in request.legs]
+    )
+    return {"fares": fares, "total_fare": total_fare(fares)}
@@ -1,35 +1,184 @@
 from fastapi import Request, Response
-import json
+from fastapi.responses import StreamingResponse
 import httpx
+import orjson
+from config import (
+    BACKEND_SLOW_CALL_SECONDS,
+    HEDGE_REQUESTS,
+    BACKEND_MAX_CONCURRENCY,
+    BACKEND_RESERVED_CONCURRENCY,
+    BACKEND_MAX_QUEUE,
+    BACKEND_QUEUE_TIMEOUT,
+)
+from utils.admission import NORMAL, AdmissionController
+from utils.circuit_breaker import upstream_breaker
+from utils.http_client import get_client
+from utils.metrics import BACKEND, timed
 
 MAX_TIMEOUT = 120
 
+# Bounds the requests waiting on the backend, which can take MAX_TIMEOUT
+backend_admission = AdmissionController(
+    name="backend",
+    max_concurrent=BACKEND_MAX_CONCURRENCY,
+    max_queue=BACKEND_MAX_QUEUE,
+    queue_timeout=BACKEND_QUEUE_TIMEOUT,
+    reserved=BACKEND_RESERVED_CONCURRENCY,
+)
 
-async def forward_request(request: Request, method: str, url: str) -> Response:
-    """Forward a request with its body, headers, cookies, and query parameters to another service."""
+# Fails fast with a 503 while the backend is erroring or hanging
+backend_breaker = upstream_breaker("backend", BACKEND_SLOW_CALL_SECONDS)
+
+# Headers that only apply to a single connection and must not be proxied
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "trailers",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+
+
+def filter_headers(headers, exclude=()) -> dict:
+    """Drop hop-by-hop headers, including any named in `Connection`."""
+    connection_tokens = {
+        token.strip().lower()
+        for name, value in headers.items()
+        if name.lower() == "connection"
+        for token in value.split(",")
+        if token.strip()
+    }
+    dropped = HOP_BY_HOP_HEADERS | connection_tokens | set(exclude)
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in dropped
+    }
+
+
+async def forward_request(
+    request: Request,
+    method: str,
+    url: str,
+    stream: bool = False,
+    priority: int = NORMAL,
+) -> Response:
+    """Forward a request with its body, headers, cookies, and query parameters to another service.
+
+    Requests beyond the backend's capacity wait by `priority` and are
+    rejected with a 503 if no slot frees up in time.
+    """
+    if stream:
+        return await stream_request(request, method, url, priority)
+
+    # Only well-formed JSON is forwarded. It is sent as the original bytes
+    # rather than being decoded and re-encoded
     body = await request.body()
     try:
-        json_body = json.loads(body)
-    except json.JSONDecodeError:
+        json_body = body if orjson.loads(body) is not None else None
+    except orjson.JSONDecodeError:
         json_body = None
+    headers = {"Content-Type": "application/json"} if json_body else None
 
     query_params = request.query_params
 
-    async with httpx.AsyncClient() as client:
-        cookies = request.cookies
-        response = await client.request(
-            method=method,
-            url=url,
-            json=json_body,
-            cookies=cookies,
-            params=query_params,
-            timeout=MAX_TIMEOUT,
-        )
+    # Shared client so connections to the backend are kept alive and reused
+    client = get_client()
+    cookies = request.cookies
+    # Only reads are safe to send twice, and only their latency sets when
+    # to hedge, not that of slow writes such as itinerary generation
+    is_read = method.lower() == "get"
+    # Do not queue for a slot just to be refused by an open breaker
+    backend_breaker.fail_fast()
+    async with backend_admission.admit(priority):
+        with timed(BACKEND):
+            response = await backend_breaker.call(
+                lambda: client.request(
+                    method=method,
+                    url=url,
+                    content=json_body,
+                    headers=headers,
+                    cookies=cookies,
+                    params=query_params,
+                    timeout=MAX_TIMEOUT,
+                ),
+                hedge=HEDGE_REQUESTS and is_read,
+                sample_latency=is_read,
+            )
+    response.raise_for_status()
+
+    # Return response with cookies from the backend if needed
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        headers=response.headers,
+    )
+
+
+async def stream_request(
+    request: Request, method: str, url: str, priority: int = NORMAL
+) -> StreamingResponse:
+    """Pipe the raw request body upstream and stream the response back.
+
+    The admission slot is held until the response has been streamed.
+    """
+    # Only send a body when the client sent one, otherwise httpx would
+    # switch an empty GET to chunked transfer encoding
+    has_body = (
+        "content-length" in request.headers
+        or "transfer-encoding" in request.headers
+    )
+
+    client = get_client()
+    upstream_request = client.build_request(
+        method=method,
+        url=url,
+        content=request.stream() if has_body else None,
+        headers=filter_headers(request.headers, exclude=("host",)),
+        params=request.query_params,
+        timeout=MAX_TIMEOUT,
+    )
+    backend_breaker.fail_fast()
+    await backend_admission.acquire(priority)
+    try:
+        # Timed up to the upstream headers; the body streams afterwards
+        with timed(BACKEND):
+            response = await backend_breaker.call(
+                lambda: client.send(upstream_request, stream=True),
+                sample_latency=method.lower() == "get",
+            )
+    except BaseException:
+        backend_admission.release()
+        raise
+
+    try:
         response.raise_for_status()
+    except httpx.HTTPStatusError:
+        await response.aclose()
+        backend_admission.release()
+        raise
+
+    async def body():
+        # Close in the generator rather than a background task, which is
+        # skipped when the upstream body fails part way through
+        try:
+            async for chunk in response.aiter_raw():
+                yield chunk
+        finally:
+            try:
+                await response.aclose()
+            finally:
+                backend_admission.release()
 
-        # Return response with cookies from the backend if needed
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
-            headers=response.headers,
-        )
+    # Raw chunks keep the upstream content-encoding and content-length valid
+    return StreamingResponse(
+        body(),
+        status_code=response.status_code,
+        headers=filter_headers(response.headers),
+    )
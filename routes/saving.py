@@ -1,40 +1,122 @@
-from fastapi import APIRouter, HTTPException, Depends, Cookie
+import asyncio
+import logging
+from datetime import datetime
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Depends,
+    Cookie,
+    Header,
+    Query,
+    Response,
+)
 from fastapi.security import APIKeyCookie
-import requests
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
+from pydantic import ValidationError
+from typing import Annotated, List, Optional
 from uuid import UUID
 from models.models import (
+    BulkTripRequest,
     FullItinerary,
+    ItineraryItem,
+    ItineraryPatch,
 )
+from utils.auth import validate_token
+from utils.trip_cache import get_trip_cache
+from utils.database import TripsRepository, get_repository
 from utils.utils import (
     create_trip_data,
-    itinerary_to_activity,
     activity_to_itinerary,
+    activities_to_itineraries,
+    itineraries_to_activities,
+    group_activities_by_trip,
+    encode_trips_cursor,
+    decode_trips_cursor,
+    diff_activities,
+    make_etag,
+    etag_matches,
 )
-import json
+import orjson
 
-load_dotenv()
+router = APIRouter()
 
-url: str = os.getenv("PROJECT_URL")
-key: str = os.getenv("API_KEY")
-auth_url: str = os.getenv("AUTH_URL")
+logger = logging.getLogger(__name__)
 
-supabase: Client = create_client(url, key)
+cookie_sec = APIKeyCookie(name="token")
 
-router = APIRouter()
+# Trip columns that may be requested through `fields=`
+TRIP_FIELDS = frozenset(
+    {
+        "trip_id",
+        "user_id",
+        "city",
+        "custom_name",
+        "date_of_trip",
+        "date_created",
+        "time_of_day",
+        "group",
+    }
+)
+MAX_TRIPS_PAGE_SIZE = 100
 
-cookie_sec = APIKeyCookie(name="token")
+
+async def get_current_user(token: str = Depends(cookie_sec)):
+    return await validate_token(token)
 
 
-def get_current_user(token: str = Depends(cookie_sec)):
-    validate_response = requests.get(
-        f"{auth_url}/validate", cookies={"token": token}
+def json_response(body: bytes, etag: str, if_none_match: Optional[str]):
+    """The serialized payload, or a bodiless 304 if the client has it."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=body, media_type="application/json", headers=headers
     )
-    if validate_response.status_code != 200:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return validate_response.json().get("user_id")
+
+
+async def read_through(
+    user_id: str, request_key: str, load, if_none_match: Optional[str]
+):
+    """Serve a trips response from the per-user cache or `load` it.
+
+    The payload is serialized and hashed into its ETag once, when it is
+    loaded. Hits reuse both, so a matching If-None-Match is answered
+    with a 304 without serializing anything. A failing cache store is
+    logged and bypassed.
+    """
+    trip_cache = get_trip_cache()
+    key = None
+    if trip_cache.enabled:
+        try:
+            key = await trip_cache.key(user_id, request_key)
+            cached = await trip_cache.get(key)
+        except Exception:
+            logger.warning("Trip cache unavailable", exc_info=True)
+            key = cached = None
+        if cached is not None:
+            etag, body = cached.split(b"\n", 1)
+            return json_response(body, etag.decode(), if_none_match)
+
+    body = orjson.dumps(await load())
+    etag = make_etag(body)
+    if key is not None:
+        try:
+            await trip_cache.set(key, etag.encode() + b"\n" + body)
+        except Exception:
+            logger.warning("Trip cache unavailable", exc_info=True)
+    return json_response(body, etag, if_none_match)
+
+
+async def invalidate_trips(user_id: str) -> None:
+    """Drop the user's cached trips after a write."""
+    trip_cache = get_trip_cache()
+    if not trip_cache.enabled:
+        return
+    try:
+        await trip_cache.invalidate_user(user_id)
+    except Exception:
+        logger.warning(
+            "Failed to invalidate cached trips for %s", user_id, exc_info=True
+        )
 
 
 @router.post("/save")
@@ -46,7 +128,7 @@ async def save_trip(
 
     # Look for cookie data on search parameters
     try:
-        cookie_data = json.loads(searchConfig)
+        cookie_data = orjson.loads(searchConfig)
     except Exception:
         cookie_data = {}
 
@@ -59,28 +141,19 @@ async def save_trip(
 
     trip = create_trip_data(location, timeOfDay, group, date).model_dump()
     trip["user_id"] = user_id
-    trip_response = supabase.table("trips").insert(trip).execute()
 
     # Convert acitivity to the correct format (comma separated lists rather than str)
-    activities = [
-        itinerary_to_activity(activity).model_dump()
-        for activity in trip_request.itinerary
-    ]
+    activities = itineraries_to_activities(trip_request.itinerary)
 
-    trip_id = trip_response.data[0]["trip_id"]
-
-    for activity in activities:
-        activity["trip_id"] = trip_id
-
-    activities_response = (
-        supabase.table("activities").insert(activities).execute()
-    )
+    # Trip and activities are written together in one transaction
+    trip_id = await get_repository().save_trip(trip, activities)
 
-    if not activities_response.data:
+    if not trip_id:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to insert activities: {activities_response.status_code}",
+            detail="Failed to save trip",
         )
+    await invalidate_trips(user_id)
 
     return {
         "success": "Trip and activities added successfully",
@@ -88,93 +161,209 @@ async def save_trip(
     }
 
 
+def trip_select_list(fields: Optional[str], paginated: bool) -> str:
+    """Map a `fields=` parameter onto the Supabase select list."""
+    if not fields:
+        return "*"
+
+    columns = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(columns) - TRIP_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown trip fields: {', '.join(unknown)}",
+        )
+
+    # trip_id groups activities and, with date_created, forms the cursor
+    required = ["trip_id", "date_created"] if paginated else ["trip_id"]
+    for column in required:
+        if column not in columns:
+            columns.append(column)
+    return ",".join(columns)
+
+
 @router.get("/trips")
-async def get_trips(user_id: str = Depends(get_current_user)):
-    try:
-        trips_response = (
-            supabase.table("trips")
-            .select("*")
-            .eq("user_id", user_id)
-            .execute()
+async def get_trips(
+    user_id: str = Depends(get_current_user),
+    limit: Annotated[
+        Optional[int], Query(ge=1, le=MAX_TRIPS_PAGE_SIZE)
+    ] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    summary: bool = False,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    paginated = limit is not None or cursor is not None
+    select_list = trip_select_list(fields, paginated)
+
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_trips_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if paginated:
+        limit = limit or MAX_TRIPS_PAGE_SIZE
+
+    async def load_trips():
+        repository = get_repository()
+        # Fetch one extra row to learn whether another page exists
+        trips = await repository.list_trips(
+            user_id,
+            columns=select_list,
+            limit=limit + 1 if paginated else None,
+            after=after,
         )
 
-        if not trips_response.data:
+        if not trips and after is None:
             return {"message": f"No trips found for user ID {user_id}"}
 
-        trips = trips_response.data
+        next_cursor = None
+        if paginated and len(trips) > limit:
+            trips = trips[:limit]
+            next_cursor = encode_trips_cursor(trips[-1])
+
+        activities_by_trip = {}
+        if not summary:
+            # Fetch activities for all trips at once rather than one per trip
+            activities = await repository.list_activities(
+                [trip["trip_id"] for trip in trips]
+            )
+            activities_by_trip = group_activities_by_trip(activities)
 
         trips_with_activities = []
 
         for trip in trips:
-            trip_id = trip["trip_id"]
-            trip["timeOfDay"] = trip["time_of_day"].split(",")
-
-            # Fetch activities for the current trip
-            activities_response = (
-                supabase.table("activities")
-                .select("*")
-                .eq("trip_id", trip_id)
-                .execute()
-            )
-
-            # Add activities to the trip object
-            activities = (
-                activities_response.data if activities_response.data else []
-            )
+            if "time_of_day" in trip:
+                trip["timeOfDay"] = trip["time_of_day"].split(",")
 
             # reformat to correct type
-            activities_db = [
-                activity_to_itinerary(activity) for activity in activities
-            ]
-
-            trip["itinerary"] = activities_db
+            if not summary:
+                trip["itinerary"] = activities_to_itineraries(
+                    activities_by_trip.get(trip["trip_id"], [])
+                )
 
             trips_with_activities.append(trip)
 
-        return {"user_id": user_id, "trips": trips_with_activities}
+        response = {"user_id": user_id, "trips": trips_with_activities}
+        if paginated:
+            response["next_cursor"] = next_cursor
+        return response
+
+    try:
+        request_key = f"list:{limit}:{cursor}:{select_list}:{summary}"
+        return await read_through(
+            user_id, request_key, load_trips, if_none_match
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/save/bulk")
+async def save_trips(
+    bulk_request: BulkTripRequest,
+    user_id: str = Depends(get_current_user),
+):
+    today = datetime.now().strftime("%Y-%m-%d")
+    trips = []
+    for trip_request in bulk_request.trips:
+        trip = trip_request.trip.model_dump()
+        trip["user_id"] = user_id
+        trip["date_created"] = trip["date_created"] or today
+        activities = [
+            activity.model_dump() for activity in trip_request.activities
+        ]
+        trips.append((trip, activities))
+
+    # Every trip and activity is written in one transaction
+    trip_ids = await get_repository().save_trips(trips)
+    if len(trip_ids) != len(trips):
+        raise HTTPException(status_code=500, detail="Failed to save trips")
+    await invalidate_trips(user_id)
+
+    return {
+        "success": "Trips and activities added successfully",
+        "trip_ids": trip_ids,
+    }
+
+
 @router.get("/trips/{trip_id}")
 async def get_single_trip(
-    trip_id: UUID, user_id: str = Depends(get_current_user)
+    trip_id: UUID,
+    user_id: str = Depends(get_current_user),
+    if_none_match: Annotated[Optional[str], Header()] = None,
 ):
-    try:
-        trip_response = (
-            supabase.table("trips")
-            .select("*")
-            .eq("trip_id", str(trip_id))
-            .eq("user_id", user_id)
-            .execute()
+
+    async def load_trip():
+        repository = get_repository()
+        # Activities are only returned once the trip's owner is confirmed
+        trip, activities = await asyncio.gather(
+            repository.get_trip(str(trip_id), user_id),
+            repository.get_activities(str(trip_id)),
         )
 
-        if not trip_response.data:
+        if trip is None:
             raise HTTPException(
                 status_code=404,
                 detail="Trip not found or does not belong to the user",
             )
 
-        trip = trip_response.data[0]
+        trip["activities"] = activities
 
-        activities_response = (
-            supabase.table("activities")
-            .select("*")
-            .eq("trip_id", str(trip_id))
-            .execute()
-        )
+        return trip
 
-        trip["activities"] = (
-            activities_response.data if activities_response.data else []
+    try:
+        return await read_through(
+            user_id, f"trip:{trip_id}", load_trip, if_none_match
         )
 
-        return trip
-
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def get_owned_activities(
+    repository: TripsRepository, trip_id: str, user_id: str
+) -> List[dict]:
+    """Stored activities of a trip, or a 404 if the user does not own it."""
+    trip, activities = await asyncio.gather(
+        repository.get_trip(trip_id, user_id, columns="trip_id"),
+        repository.get_activities(trip_id),
+    )
+    if trip is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Trip not found or does not belong to the user",
+        )
+    return activities
+
+
+async def apply_activity_changes(
+    repository: TripsRepository,
+    trip_id: str,
+    user_id: str,
+    stored: List[dict],
+    activities: List[dict],
+) -> None:
+    """Write only the activities that differ from the stored ones."""
+    upserts, deleted_ids = diff_activities(stored, activities)
+
+    if not upserts and not deleted_ids:
+        return
+
+    # Ownership is checked again inside the transaction
+    found = await repository.apply_activity_changes(
+        trip_id, user_id, upserts, deleted_ids
+    )
+    if not found:
+        raise HTTPException(
+            status_code=404,
+            detail="Trip not found or does not belong to the user",
+        )
+    await invalidate_trips(user_id)
+
+
 @router.put("/trips/{trip_id}")
 async def edit_trip(
     trip_id: UUID,
@@ -183,34 +372,49 @@ async def edit_trip(
 ):
 
     # Convert acitivity to the correct format (comma separated lists rather than str)
-    activities = [
-        itinerary_to_activity(activity).model_dump()
-        for activity in trip_update_request.itinerary
-    ]
-
-    trip_response = (
-        supabase.table("trips")
-        .select("*")
-        .eq("trip_id", trip_id)
-        .eq("user_id", user_id)
-        .execute()
-    )
+    activities = itineraries_to_activities(trip_update_request.itinerary)
 
-    if not trip_response.data:
-        raise HTTPException(
-            status_code=404,
-            detail="Trip not found or does not belong to the user",
-        )
+    repository = get_repository()
+    stored = await get_owned_activities(repository, str(trip_id), user_id)
 
+    # An empty itinerary leaves the stored activities as they are
     if activities:
-        supabase.table("activities").delete().eq(
-            "trip_id", str(trip_id)
-        ).execute()
+        await apply_activity_changes(
+            repository, str(trip_id), user_id, stored, activities
+        )
+
+    return {"success": "Trip and activities updated successfully"}
 
-        for activity in activities:
-            activity["trip_id"] = str(trip_id)
 
-        supabase.table("activities").insert(activities).execute()
+@router.patch("/trips/{trip_id}")
+async def patch_trip(
+    trip_id: UUID,
+    trip_patch_request: ItineraryPatch,
+    user_id: str = Depends(get_current_user),
+):
+    repository = get_repository()
+    stored = await get_owned_activities(repository, str(trip_id), user_id)
+
+    items = {
+        activity["id"]: activity_to_itinerary(activity) for activity in stored
+    }
+    try:
+        for change in trip_patch_request.items:
+            fields = change.model_dump(exclude_unset=True)
+            current = items.get(change.id)
+            if current is not None:
+                fields = {**current.model_dump(), **fields}
+            items[change.id] = ItineraryItem.model_validate(fields)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    for item_id in trip_patch_request.removed:
+        items.pop(item_id, None)
+
+    activities = itineraries_to_activities(items.values())
+    await apply_activity_changes(
+        repository, str(trip_id), user_id, stored, activities
+    )
 
     return {"success": "Trip and activities updated successfully"}
 
@@ -218,39 +422,19 @@ async def edit_trip(
 @router.delete("/trips/{trip_id}")
 async def delete_trip(trip_id: UUID, user_id: str = Depends(get_current_user)):
     try:
-        trip_response = (
-            supabase.table("trips")
-            .select("*")
-            .eq("trip_id", str(trip_id))
-            .eq("user_id", user_id)
-            .execute()
-        )
+        # Ownership check and both deletes run in one transaction
+        deleted = await get_repository().delete_trip(str(trip_id), user_id)
 
-        if not trip_response.data:
+        if not deleted:
             raise HTTPException(
                 status_code=404,
                 detail="Trip not found or does not belong to the user",
             )
+        await invalidate_trips(user_id)
 
-        supabase.table("activities").delete().eq(
-            "trip_id", str(trip_id)
-        ).execute()
-
-        trip_delete_response = (
-            supabase.table("trips")
-            .delete()
-            .eq("trip_id", str(trip_id))
-            .execute()
-        )
-
-        if trip_delete_response.data:
-            return {
-                "success": "Trip and associated activities deleted successfully"
-            }
-        else:
-            raise HTTPException(
-                status_code=500, detail="Failed to delete the trip"
-            )
+        return {
+            "success": "Trip and associated activities deleted successfully"
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Response
+from utils.admission import admission_stats
+from utils.cache import cache_stats
+from utils.circuit_breaker import breaker_stats
+from utils.http_client import pool_stats
+from utils.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/stats/pool")
+async def get_pool_stats():
+    """Connection pool statistics for the shared outbound HTTP client."""
+    return pool_stats()
+
+
+@router.get("/stats/cache")
+async def get_cache_stats():
+    """Hit/miss counters and sizes for the in-process caches."""
+    return cache_stats()
+
+
+@router.get("/stats/admission")
+async def get_admission_stats():
+    """Concurrency, queue and shedding counters per upstream."""
+    return admission_stats()
+
+
+@router.get("/stats/breakers")
+async def get_breaker_stats():
+    """Circuit breaker state and hedging counters per upstream."""
+    return breaker_stats()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Latency histograms in the Prometheus text exposition format."""
+    return Response(
+        render_metrics(), media_type="text/plain; version=0.0.4"
+    )
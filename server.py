@@ -0,0 +1,75 @@
+"""Production entry point: several uvicorn workers on uvloop and httptools.
+
+Run with `python server.py`. Each worker is a separate process that
+imports `main:app` and opens its own connection pools in the app
+lifespan. On SIGTERM or SIGINT, workers stop accepting connections and
+let in-flight requests, including forwarded ones, finish for up to
+GRACEFUL_SHUTDOWN_TIMEOUT seconds before the pools are closed.
+"""
+
+import math
+import os
+import uvicorn
+from config import (
+    HOST,
+    PORT,
+    WEB_CONCURRENCY,
+    GRACEFUL_SHUTDOWN_TIMEOUT,
+    TRIP_CACHE_TTL,
+    TRIP_CACHE_URL,
+)
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and cgroup quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # A container limited with --cpus still sees every host CPU above
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    return WEB_CONCURRENCY if WEB_CONCURRENCY > 0 else available_cpus()
+
+
+def check_trip_cache(workers: int) -> None:
+    """Refuse to start several workers with an in-process trips cache.
+
+    Writes only invalidate the cache of the worker that handled them, so
+    with several workers the others would keep serving, and answering 304
+    for, trips that have changed.
+    """
+    if workers > 1 and TRIP_CACHE_TTL > 0 and not TRIP_CACHE_URL:
+        raise SystemExit(
+            f"{workers} workers cannot share the in-process trips cache. "
+            "Set TRIP_CACHE_URL to a Redis-compatible server, "
+            "TRIP_CACHE_TTL=0 to turn the cache off, or WEB_CONCURRENCY=1."
+        )
+
+
+def main() -> None:
+    workers = worker_count()
+    check_trip_cache(workers)
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    main()
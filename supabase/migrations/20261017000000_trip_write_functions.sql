@@ -0,0 +1,98 @@
+-- Transactional writes for saved trips.
+--
+-- Each function runs in a single transaction, so a trip is never left
+-- without its activities (or with half of them) when a request fails
+-- part way through, and each API write costs one round-trip.
+
+create or replace function insert_trip_activities(
+    p_trip_id uuid,
+    p_activities jsonb
+) returns void
+language sql
+as $$
+    insert into activities (
+        trip_id, id, title, start, "end", description, price, theme,
+        transport, transport_mode, requires_booking, booking_url, weather,
+        temperature, image_link, duration, latitude, longitude
+    )
+    select
+        p_trip_id, id, title, start, "end", description, price, theme,
+        transport, transport_mode, requires_booking, booking_url, weather,
+        temperature, image_link, duration, latitude, longitude
+    from jsonb_populate_recordset(null::activities, p_activities);
+$$;
+
+
+-- Insert a trip and its activities, returning the new trip_id
+create or replace function save_trip(
+    p_trip jsonb,
+    p_activities jsonb
+) returns uuid
+language plpgsql
+as $$
+declare
+    v_trip_id uuid;
+begin
+    insert into trips (
+        user_id, city, custom_name, date_of_trip, date_created,
+        time_of_day, "group"
+    )
+    select
+        user_id, city, custom_name, date_of_trip, date_created,
+        time_of_day, "group"
+    from jsonb_populate_record(null::trips, p_trip)
+    returning trip_id into v_trip_id;
+
+    perform insert_trip_activities(v_trip_id, p_activities);
+    return v_trip_id;
+end;
+$$;
+
+
+-- Insert many trips with their activities, all or none. p_trips is an
+-- array of {"trip": ..., "activities": [...]}; the new trip_ids are
+-- returned in the same order
+create or replace function save_trips(
+    p_trips jsonb
+) returns uuid[]
+language plpgsql
+as $$
+declare
+    v_trip_ids uuid[] := '{}';
+    v_entry jsonb;
+begin
+    for v_entry in
+        select value from jsonb_array_elements(p_trips) with ordinality
+        order by ordinality
+    loop
+        v_trip_ids := v_trip_ids || save_trip(
+            v_entry -> 'trip',
+            coalesce(v_entry -> 'activities', '[]'::jsonb)
+        );
+    end loop;
+    return v_trip_ids;
+end;
+$$;
+
+
+-- Delete a trip and its activities if it belongs to the user. Returns
+-- false if the trip is not found.
+create or replace function delete_trip(
+    p_trip_id uuid,
+    p_user_id text
+) returns boolean
+language plpgsql
+as $$
+begin
+    perform 1 from trips
+    where trip_id = p_trip_id and user_id::text = p_user_id
+    for update;
+    if not found then
+        return false;
+    end if;
+
+    delete from activities where trip_id = p_trip_id;
+    delete from trips where trip_id = p_trip_id;
+    return true;
+end;
+$$;
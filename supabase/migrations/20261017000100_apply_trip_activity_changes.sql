@@ -0,0 +1,63 @@
+-- Apply a precomputed diff to a trip's activities.
+--
+-- Activities are identified within a trip by their itinerary item id.
+-- Rows in p_upserts replace the stored row with the same id or are
+-- inserted if there is none; ids in p_deleted_ids are removed. Returns
+-- false if the trip does not exist or belongs to someone else.
+create or replace function apply_trip_activity_changes(
+    p_trip_id uuid,
+    p_user_id text,
+    p_upserts jsonb,
+    p_deleted_ids bigint[]
+) returns boolean
+language plpgsql
+as $$
+begin
+    perform 1 from trips
+    where trip_id = p_trip_id and user_id::text = p_user_id
+    for update;
+    if not found then
+        return false;
+    end if;
+
+    delete from activities
+    where trip_id = p_trip_id and id = any(p_deleted_ids);
+
+    update activities a set
+        title = n.title,
+        start = n.start,
+        "end" = n."end",
+        description = n.description,
+        price = n.price,
+        theme = n.theme,
+        transport = n.transport,
+        transport_mode = n.transport_mode,
+        requires_booking = n.requires_booking,
+        booking_url = n.booking_url,
+        weather = n.weather,
+        temperature = n.temperature,
+        image_link = n.image_link,
+        duration = n.duration,
+        latitude = n.latitude,
+        longitude = n.longitude
+    from jsonb_populate_recordset(null::activities, p_upserts) n
+    where a.trip_id = p_trip_id and a.id = n.id;
+
+    perform insert_trip_activities(
+        p_trip_id,
+        coalesce(
+            (
+                select jsonb_agg(item)
+                from jsonb_array_elements(p_upserts) item
+                where not exists (
+                    select 1 from activities a
+                    where a.trip_id = p_trip_id
+                    and a.id = (item ->> 'id')::bigint
+                )
+            ),
+            '[]'::jsonb
+        )
+    );
+    return true;
+end;
+$$;
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+
+from utils.admission import HIGH, LOW, NORMAL, AdmissionController, Overloaded
+
+
+def controller(**options):
+    settings = dict(max_concurrent=2, max_queue=2, queue_timeout=1)
+    return AdmissionController(name="test", **{**settings, **options})
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_retry_after():
+    backend = controller(max_concurrent=1, max_queue=1, queue_timeout=2.5)
+    await backend.acquire()
+    waiting = asyncio.ensure_future(backend.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as rejected:
+        await backend.acquire()
+
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers == {"Retry-After": "3"}
+    backend.release()
+    await waiting
+    assert backend.in_flight == 1 and backend.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_past_the_deadline_is_shed():
+    backend = controller(max_concurrent=1, queue_timeout=0.01)
+    await backend.acquire()
+
+    with pytest.raises(Overloaded):
+        await backend.acquire()
+
+    assert backend.timed_out == 1
+    # The abandoned wait does not swallow the next free slot
+    backend.release()
+    await asyncio.wait_for(backend.acquire(), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_freed_slots_go_to_the_highest_priority_first():
+    backend = controller(max_concurrent=1, max_queue=5)
+    order = []
+
+    async def call(name, priority):
+        async with backend.admit(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    await backend.acquire()
+    calls = [
+        asyncio.ensure_future(call("itinerary", LOW)),
+        asyncio.ensure_future(call("other", NORMAL)),
+        asyncio.ensure_future(call("activities", HIGH)),
+    ]
+    await asyncio.sleep(0)
+    backend.release()
+    await asyncio.gather(*calls)
+
+    assert order == ["activities", "other", "itinerary"]
+
+
+@pytest.mark.asyncio
+async def test_reserved_slots_are_only_for_high_priority():
+    backend = controller(max_concurrent=3, reserved=1, queue_timeout=0.01)
+    await backend.acquire(LOW)
+    await backend.acquire(LOW)
+
+    with pytest.raises(Overloaded):
+        await backend.acquire(LOW)
+    await asyncio.wait_for(backend.acquire(HIGH), 0.1)
+
+    assert backend.in_flight == 3
@@ -0,0 +1,54 @@
+import pytest
+import httpx
+from fastapi import HTTPException
+from unittest.mock import patch
+from utils import auth
+
+
+@pytest.fixture(autouse=True)
+def auth_url():
+    # Independent of whatever AUTH_URL the environment provides
+    with patch("utils.auth.AUTH_URL", "http://auth"):
+        yield
+
+
+def mock_auth_service(statuses):
+    calls = []
+
+    def validate(request: httpx.Request):
+        calls.append(request.headers.get("cookie"))
+        status = statuses[request.headers.get("cookie")]
+        return httpx.Response(status, json={"user_id": "user-1"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(validate))
+    return client, calls
+
+
+@pytest.mark.asyncio
+async def test_valid_token_is_cached():
+    auth.clear_token_cache()
+    client, calls = mock_auth_service({"token=good": 200})
+
+    with patch("utils.auth.get_client", return_value=client):
+        assert await auth.validate_token("good") == "user-1"
+        assert await auth.validate_token("good") == "user-1"
+
+        auth.invalidate_user("user-1")
+        assert await auth.validate_token("good") == "user-1"
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_token_is_negatively_cached():
+    auth.clear_token_cache()
+    client, calls = mock_auth_service({"token=bad": 401, "token=down": 503})
+
+    with patch("utils.auth.get_client", return_value=client):
+        for token in ("bad", "bad", "down", "down"):
+            with pytest.raises(HTTPException) as error:
+                await auth.validate_token(token)
+            assert error.value.status_code == 401
+
+    # The 401 is remembered, the auth service outage is not
+    assert calls == ["token=bad", "token=down", "token=down"]
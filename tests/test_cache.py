@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from utils.cache import TTLCache
+from routes.activities import activities_cache_key
+
+
+def test_expired_entries_are_misses():
+    cache = TTLCache(name="test-expiry", ttl=10)
+
+    with patch("utils.cache.time.monotonic", return_value=100):
+        cache.set("key", "value")
+    with patch("utils.cache.time.monotonic", return_value=105):
+        assert cache.get("key") == "value"
+    with patch("utils.cache.time.monotonic", return_value=111):
+        assert cache.get("key") is None
+
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_least_recently_used_entry_is_evicted_over_budget():
+    cache = TTLCache(name="test-lru", ttl=60, max_bytes=10)
+    cache.set("a", "A", size=4)
+    cache.set("b", "B", size=4)
+    cache.get("a")
+    cache.set("c", "C", size=4)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["bytes"] == 8
+    assert cache.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    cache = TTLCache(name="test-coalesce", ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("key", loader) for _ in range(5))
+    )
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache.coalesced == 4
+
+
+def test_activities_cache_key_normalizes_city_and_time_of_day():
+    first = activities_cache_key(
+        b'{"city": "London ", "timeOfDay": ["Evening", "Morning"],'
+        b' "group": "Family"}'
+    )
+    second = activities_cache_key(
+        b'{"group": "Family", "city": "london",'
+        b' "timeOfDay": ["Morning", "Evening"]}'
+    )
+
+    assert first == second
+    assert activities_cache_key(b"not json") is None
@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from utils.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpen,
+    hedged,
+)
+
+
+def response(status_code):
+    return SimpleNamespace(status_code=status_code)
+
+
+def breaker(**options):
+    settings = dict(min_calls=4, window=4, open_seconds=30, half_open_calls=1)
+    return CircuitBreaker(name="test", **{**settings, **options})
+
+
+async def reply(status_code):
+    return response(status_code)
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_on_errors_and_closes_after_a_probe():
+    upstream = breaker()
+
+    with patch("utils.circuit_breaker.time.monotonic", return_value=100):
+        await upstream.call(lambda: reply(200))
+        for _ in range(3):
+            await upstream.call(lambda: reply(502))
+        assert upstream.state == OPEN
+
+        with pytest.raises(CircuitOpen) as refused:
+            await upstream.call(lambda: reply(200))
+        assert refused.value.status_code == 503
+        assert refused.value.headers == {"Retry-After": "30"}
+
+    with patch("utils.circuit_breaker.time.monotonic", return_value=131):
+        await upstream.call(lambda: reply(200))
+
+    assert upstream.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_the_breaker():
+    upstream = breaker()
+
+    async def unreachable():
+        raise ConnectionError("refused")
+
+    with patch("utils.circuit_breaker.time.monotonic", return_value=100):
+        for _ in range(4):
+            with pytest.raises(ConnectionError):
+                await upstream.call(unreachable)
+    with patch("utils.circuit_breaker.time.monotonic", return_value=131):
+        upstream.check()
+        assert upstream.state == HALF_OPEN
+        upstream.record(True, 0.1, probe=True)
+
+    assert upstream.state == OPEN
+
+
+def test_slow_calls_open_the_breaker():
+    upstream = breaker(slow_call_seconds=1, slow_call_rate=0.5)
+
+    for seconds in (0.1, 0.1, 2, 3):
+        upstream.record(False, seconds)
+
+    assert upstream.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_returns_the_faster_attempt():
+    attempts = []
+
+    async def send():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            await asyncio.sleep(10)
+            return "slow"
+        return "fast"
+
+    result = await asyncio.wait_for(hedged(send, delay=0.01), 1)
+
+    assert result == "fast"
+    assert attempts == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_fast_requests_are_not_hedged():
+    attempts = []
+
+    async def send():
+        attempts.append(1)
+        return "done"
+
+    assert await hedged(send, delay=1) == "done"
+    assert attempts == [1]
+
+
+def test_only_sampled_calls_set_the_hedge_delay():
+    upstream = breaker(min_calls=100, window=100)
+    for _ in range(20):
+        upstream.record(False, 0.1)
+        # e.g. itinerary generation, which is never hedged
+        upstream.record(False, 30, sample_latency=False)
+
+    assert upstream.hedge_delay() == 0.1
+
+
+def test_fail_fast_does_not_take_a_probe():
+    upstream = breaker()
+
+    with patch("utils.circuit_breaker.time.monotonic", return_value=100):
+        for _ in range(4):
+            upstream.record(True, 0.1)
+        with pytest.raises(CircuitOpen):
+            upstream.fail_fast()
+
+    with patch("utils.circuit_breaker.time.monotonic", return_value=131):
+        upstream.fail_fast()
+        assert upstream.state == OPEN
+        assert upstream.check() is True
@@ -0,0 +1,22 @@
+import config
+from config import Settings
+
+
+def test_settings_read_renamed_environment_variables(monkeypatch):
+    monkeypatch.setenv("PROJECT_URL", "https://project.supabase.co")
+    monkeypatch.setenv("API_KEY", "key")
+    monkeypatch.setenv("STREAM_ACTIVITIES", "true")
+    monkeypatch.setenv("TRIP_CACHE_TTL", "0")
+
+    settings = Settings(_env_file=None)
+
+    assert settings.SUPABASE_URL == "https://project.supabase.co"
+    assert settings.SUPABASE_KEY == "key"
+    assert settings.STREAM_ACTIVITIES is True
+    assert settings.TRIP_CACHE_TTL == 0
+
+
+def test_module_attributes_come_from_the_cached_settings():
+    assert config.get_settings() is config.get_settings()
+    assert config.PORT == config.get_settings().PORT
+    assert config.MAX_TIMEOUT == 120
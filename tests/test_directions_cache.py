@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import patch
+from utils.directions_cache import DirectionsCache
+
+
+def test_nearby_coordinates_share_a_key():
+    cache = DirectionsCache(ttl=60, transit_ttl=10, precision=3)
+
+    first = cache.key([51.50741, -0.12781], [51.5033, -0.1196], "walking")
+    second = cache.key([51.50738, -0.12779], [51.5033, -0.1196], "walking")
+
+    assert first == second
+    assert first != cache.key([51.5074, -0.1278], [51.5033, -0.1196], "bus")
+
+
+@pytest.mark.asyncio
+async def test_transit_routes_expire_sooner():
+    cache = DirectionsCache(ttl=60, transit_ttl=10)
+    transit = cache.key([1.0, 2.0], [3.0, 4.0], "transit")
+    walking = cache.key([1.0, 2.0], [3.0, 4.0], "walking")
+
+    with patch("utils.cache.time.monotonic", return_value=100):
+        await cache.set(transit, ["bus"])
+        await cache.set(walking, ["walk"])
+    with patch("utils.cache.time.monotonic", return_value=120):
+        assert await cache.get(transit) is None
+        assert await cache.get(walking) == ["walk"]
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "directions.sqlite")
+    cache = DirectionsCache(ttl=60, transit_ttl=10, path=path)
+    key = cache.key([1.0, 2.0], [3.0, 4.0], "driving")
+    await cache.set(key, [{"duration": "5 mins", "polyline": [[1.0, 2.0]]}])
+
+    restarted = DirectionsCache(ttl=60, transit_ttl=10, path=path)
+
+    assert await restarted.get(key) == [
+        {"duration": "5 mins", "polyline": [[1.0, 2.0]]}
+    ]
+    assert restarted.memory.hits == 0 and restarted.memory.misses == 1
+    await cache.close()
+    await restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_keeps_the_newest_entries(tmp_path):
+    path = str(tmp_path / "directions.sqlite")
+    cache = DirectionsCache(
+        ttl=60, transit_ttl=10, path=path, disk_max_entries=2
+    )
+    keys = [cache.key([1.0, 2.0], [3.0, n], "driving") for n in range(3)]
+    for n, key in enumerate(keys):
+        await cache.set(key, [n])
+
+    restarted = DirectionsCache(ttl=60, transit_ttl=10, path=path)
+
+    assert [await restarted.get(key) for key in keys] == [None, [1], [2]]
+    await cache.close()
+    await restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_broken_disk_tier_falls_back_to_memory(tmp_path, caplog):
+    # A directory cannot be opened as a database
+    cache = DirectionsCache(ttl=60, transit_ttl=10, path=str(tmp_path))
+    key = cache.key([1.0, 2.0], [3.0, 4.0], "walking")
+
+    assert await cache.get(key) is None
+    await cache.set(key, ["walk"])
+
+    assert await cache.get(key) == ["walk"]
+    assert "Directions disk cache unavailable" in caplog.text
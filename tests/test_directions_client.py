@@ -0,0 +1,50 @@
+import pytest
+import httpx
+from unittest.mock import patch
+from utils import directions_client
+
+
+def mock_google(responses):
+    calls = []
+
+    def directions(request: httpx.Request):
+        calls.append(request.url.params["origin"])
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(directions))
+    return client, calls
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    client, calls = mock_google(
+        [
+            httpx.ConnectError("refused"),
+            httpx.Response(503),
+            httpx.Response(200, json={"status": "OK", "routes": []}),
+        ]
+    )
+
+    with patch.object(
+        directions_client, "get_client", return_value=client
+    ), patch.object(directions_client, "_backoff", return_value=0):
+        data = await directions_client.fetch_directions({"origin": "1,2"})
+
+    assert data == {"status": "OK", "routes": []}
+    assert calls == ["1,2"] * 3
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_the_last_retry():
+    client, calls = mock_google([httpx.Response(502)] * 3)
+
+    with patch.object(
+        directions_client, "get_client", return_value=client
+    ), patch.object(directions_client, "_backoff", return_value=0):
+        with pytest.raises(directions_client.DirectionsError):
+            await directions_client.fetch_directions({"origin": "1,2"})
+
+    assert len(calls) == directions_client.DIRECTIONS_MAX_RETRIES + 1
@@ -0,0 +1,34 @@
+import json
+from utils.fares import FareTables, estimate_leg_fares, total_fare
+
+
+def test_legs_are_costed_by_mode_and_city():
+    tables = FareTables.load()
+    legs = [
+        {"city": "London", "mode": "driving", "distance_km": 5.0},
+        {
+            "city": "london",
+            "mode": "transit",
+            "transit_steps": [{"type": "BUS"}, {"type": "SUBWAY"}],
+        },
+        {"city": "London", "mode": "walking", "distance_km": 2.0},
+        {"city": "Atlantis", "mode": "driving", "distance_km": 1.0},
+    ]
+
+    fares = estimate_leg_fares(tables, legs)
+
+    assert fares == [13.2, 4.15, 0.0, None]
+    assert total_fare(fares) == 17.35
+    assert estimate_leg_fares(tables, []) == []
+
+
+def test_data_file_adds_cities(tmp_path):
+    path = tmp_path / "fares.json"
+    path.write_text(
+        json.dumps({"taxi": {"Paris": {"base_fare": 4.0, "per_km": 1.0}}})
+    )
+    tables = FareTables.load(str(path))
+
+    legs = [{"city": "Paris", "mode": "driving", "distance_km": 3.0}] * 2000
+
+    assert estimate_leg_fares(tables, legs) == [7.0] * 2000
@@ -0,0 +1,45 @@
+import pytest
+import httpx
+from utils import http_client
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared_until_closed():
+    client = await http_client.start_client()
+
+    assert http_client.get_client() is client
+    assert isinstance(client, httpx.AsyncClient)
+
+    await http_client.close_client()
+
+    assert http_client.get_client() is not client
+    await http_client.close_client()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_reports_limits():
+    await http_client.start_client()
+    stats = http_client.pool_stats()
+    await http_client.close_client()
+
+    assert stats["max_connections"] == http_client.HTTP_MAX_CONNECTIONS
+    assert stats["connections"] == 0
+    assert stats["pending_requests"] == 0
+
+
+@pytest.mark.asyncio
+async def test_response_cookies_are_not_shared_between_requests():
+    sent_cookies = []
+
+    def upstream(request: httpx.Request):
+        sent_cookies.append(request.headers.get("cookie"))
+        return httpx.Response(200, headers={"Set-Cookie": "session=abc"})
+
+    client = http_client.create_client()
+    client._transport = httpx.MockTransport(upstream)
+
+    await client.get("http://backend/first", cookies={"token": "user-a"})
+    await client.get("http://backend/second")
+    await client.aclose()
+
+    assert sent_cookies == ["token=user-a", None]
@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import patch
+from models.models import ItineraryItem, ItineraryRequest
+from routes import map
+
+
+def item(item_id, title, transport, mode, coord=None):
+    return ItineraryItem(
+        title=title,
+        transport=transport,
+        start="09:00",
+        end="10:00",
+        description="",
+        price=0.0,
+        theme="Transport" if transport else "Culture",
+        transportMode=mode,
+        requires_booking=False,
+        duration=60,
+        id=item_id,
+        latitude=coord,
+        longitude=coord,
+    ).model_dump()
+
+
+def place(item_id, title, coord):
+    return item(item_id, title, False, "N/A", coord)
+
+
+def step(item_id, mode, coord=None):
+    return item(item_id, f"{mode} to the next stop", True, mode, coord)
+
+
+@pytest.mark.asyncio
+async def test_itinerary_directions_dedupes_legs_and_keeps_partial_results():
+    await map.directions_cache.clear()
+    calls = []
+
+    async def directions(origin, destination, mode):
+        calls.append((tuple(origin), tuple(destination), mode))
+        if destination == [3.0, 3.0]:
+            raise RuntimeError("upstream failed")
+        return [{"duration": "5 mins"}]
+
+    request = ItineraryRequest(
+        city="London",
+        itinerary=[
+            place(0, "Hotel", 1.0),
+            step(1, "Walking", 1.5),
+            place(2, "Museum", 2.0),
+            step(3, "Tube"),
+            place(4, "Hotel", 1.0),
+            step(5, "Walking"),
+            place(6, "Museum", 2.0),
+            # Transport steps with coordinates are still not destinations
+            step(7, "Taxi", 9.0),
+            place(8, "Park", 3.0),
+        ],
+    )
+
+    with patch.object(map, "get_google_directions", directions):
+        response = await map.get_itinerary_directions(request)
+
+    legs = response["legs"]
+    assert [(leg["from"], leg["to"], leg["mode"]) for leg in legs] == [
+        ("Hotel", "Museum", "walking"),
+        ("Museum", "Hotel", "transit"),
+        ("Hotel", "Museum", "walking"),
+        ("Museum", "Park", "driving"),
+    ]
+    assert legs[0]["routes"] == legs[2]["routes"] == [{"duration": "5 mins"}]
+    assert legs[3]["mode"] == "driving" and legs[3]["error"]
+    assert len(calls) == 3
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from utils import metrics
+from utils.metrics import Histogram, MetricsMiddleware, timed
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    for histogram in metrics.METRICS.values():
+        histogram.clear()
+    yield
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test.", ("component",), (0.1, 1))
+    histogram.observe(0.05, "db")
+    histogram.observe(0.5, "db")
+    histogram.observe(5, "db")
+
+    lines = histogram.render().splitlines()
+    del metrics.METRICS["test_seconds"]
+
+    assert 'test_seconds_bucket{component="db",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{component="db",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{component="db",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{component="db"} 3' in lines
+
+
+async def run_request(app, path="/trips"):
+    scope = {"type": "http", "method": "GET", "path": path}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await MetricsMiddleware(app)(scope, receive, send)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_middleware_reports_upstream_time_in_server_timing():
+    async def app(scope, receive, send):
+        scope["route"] = SimpleNamespace(path="/trips")
+
+        async def query():
+            with timed(metrics.SUPABASE):
+                await asyncio.sleep(0)
+
+        with timed(metrics.AUTH):
+            pass
+        # Work in child tasks is still attributed to the request
+        await asyncio.gather(query(), query())
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    sent = await run_request(app)
+
+    header = dict(sent[0]["headers"])[b"server-timing"].decode()
+    names = [entry.split(";")[0] for entry in header.split(", ")]
+    assert names == ["auth", "supabase", "app"]
+    rendered = metrics.render_metrics()
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="/trips",status="200"} 1'
+    ) in rendered
+    assert (
+        'upstream_request_duration_seconds_count{component="supabase"} 2'
+    ) in rendered
+
+
+@pytest.mark.asyncio
+async def test_middleware_records_failed_requests_as_errors():
+    async def app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await run_request(app, path="/anything")
+
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="unmatched",status="500"} 1'
+    ) in metrics.render_metrics()
+
+
+def test_timing_outside_a_request_is_still_recorded():
+    with timed(metrics.GOOGLE_DIRECTIONS):
+        pass
+
+    assert (
+        'upstream_request_duration_seconds_count{component="google"} 1'
+    ) in metrics.render_metrics()
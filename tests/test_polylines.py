@@ -0,0 +1,28 @@
+import polyline
+from utils.polylines import DECODED, ENCODED, format_polyline, simplify
+
+
+def test_simplify_drops_points_within_tolerance():
+    # About 1 m off a straight line, then a real 100 m detour
+    points = [
+        (51.5000, -0.1000),
+        (51.50001, -0.0990),
+        (51.5000, -0.0980),
+        (51.5009, -0.0970),
+        (51.5000, -0.0960),
+    ]
+
+    assert simplify(points, 5) == [points[0], points[2], points[3], points[4]]
+    assert simplify(points, 0) == points
+
+
+def test_format_polyline_negotiates_the_format():
+    points = [(51.5, -0.1), (51.50001, -0.099), (51.5, -0.098)]
+    encoded = polyline.encode(points)
+
+    assert format_polyline(encoded, ENCODED) == encoded
+    assert format_polyline(encoded, DECODED) == polyline.decode(encoded)
+    assert polyline.decode(format_polyline(encoded, ENCODED, 5)) == [
+        points[0],
+        points[2],
+    ]
@@ -1,10 +1,21 @@
+import asyncio
+import time
 import pytest
-from fastapi import Request
-from unittest.mock import AsyncMock, patch
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock, patch
 import json
 
 # Import the function to test
-from routes.request_forwarder import forward_request, MAX_TIMEOUT
+from routes.request_forwarder import (
+    forward_request,
+    filter_headers,
+    backend_admission,
+    backend_breaker,
+    MAX_TIMEOUT,
+)
+from utils.circuit_breaker import OPEN, CircuitOpen
 
 
 @pytest.mark.asyncio
@@ -19,8 +30,8 @@ async def test_forward_request_with_json_body():
     target_url = "http://example.com/endpoint"
     method = "POST"
 
-    # Mock the httpx.AsyncClient to simulate a successful response
-    with patch("httpx.AsyncClient") as mock_client:
+    # Mock the shared client to simulate a successful response
+    with patch("routes.request_forwarder.get_client") as mock_get_client:
         # Create a mock response
         mock_response = AsyncMock()
         mock_response.content = b"Success response"
@@ -31,7 +42,7 @@ async def test_forward_request_with_json_body():
         # Configure the mock client to return the mock response
         mock_client_instance = AsyncMock()
         mock_client_instance.request.return_value = mock_response
-        mock_client.return_value.__aenter__.return_value = mock_client_instance
+        mock_get_client.return_value = mock_client_instance
 
         # Call the function
         response = await forward_request(mock_request, method, target_url)
@@ -46,7 +57,8 @@ async def test_forward_request_with_json_body():
         mock_client_instance.request.assert_called_once_with(
             method=method,
             url=target_url,
-            json={"key": "value"},
+            content=json.dumps({"key": "value"}).encode(),
+            headers={"Content-Type": "application/json"},
             cookies={},
             params={},
             timeout=MAX_TIMEOUT,
@@ -65,8 +77,8 @@ async def test_forward_request_with_invalid_json_body():
     target_url = "http://example.com/endpoint"
     method = "POST"
 
-    # Mock the httpx.AsyncClient to simulate a successful response
-    with patch("httpx.AsyncClient") as mock_client:
+    # Mock the shared client to simulate a successful response
+    with patch("routes.request_forwarder.get_client") as mock_get_client:
         # Create a mock response
         mock_response = AsyncMock()
         mock_response.content = b"Success response"
@@ -77,7 +89,7 @@ async def test_forward_request_with_invalid_json_body():
         # Configure the mock client to return the mock response
         mock_client_instance = AsyncMock()
         mock_client_instance.request.return_value = mock_response
-        mock_client.return_value.__aenter__.return_value = mock_client_instance
+        mock_get_client.return_value = mock_client_instance
 
         # Call the function
         response = await forward_request(mock_request, method, target_url)
@@ -92,8 +104,126 @@ async def test_forward_request_with_invalid_json_body():
         mock_client_instance.request.assert_called_once_with(
             method=method,
             url=target_url,
-            json=None,
+            content=None,
+            headers=None,
             cookies={},
             params={},
             timeout=MAX_TIMEOUT,
         )
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """Unread response body, as a real transport would return it."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def test_forward_request_streams_raw_body_and_response():
+    received = {}
+
+    async def backend(request: httpx.Request):
+        received["body"] = await request.aread()
+        received["headers"] = request.headers
+        return httpx.Response(
+            200,
+            stream=ChunkedStream([b'{"itinerary": ', b"[]}"]),
+            headers={
+                "Content-Type": "application/json",
+                "Connection": "keep-alive",
+                "Keep-Alive": "timeout=5",
+            },
+        )
+
+    app = FastAPI()
+
+    @app.post("/itinerary")
+    async def itinerary(request: Request):
+        return await forward_request(
+            request, "post", "http://backend/itinerary", stream=True
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(backend))
+    with patch("routes.request_forwarder.get_client", return_value=client):
+        response = TestClient(app).post(
+            "/itinerary", content=b'{"city": "London"}'
+        )
+
+    assert response.status_code == 200
+    assert response.content == b'{"itinerary": []}'
+    assert "keep-alive" not in response.headers
+    assert received["body"] == b'{"city": "London"}'
+    assert received["headers"]["host"] == "backend"
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """Response body whose connection drops after the first chunk."""
+
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        yield b'{"itinerary": '
+        raise httpx.ReadError("connection reset")
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_failing_midway_releases_the_slot():
+    streams = []
+
+    async def backend(request: httpx.Request):
+        streams.append(BrokenStream())
+        return httpx.Response(200, stream=streams[-1])
+
+    mock_request = MagicMock(spec=Request)
+    mock_request.headers = {}
+    mock_request.query_params = {}
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(backend))
+    with patch("routes.request_forwarder.get_client", return_value=client):
+        for _ in range(3):
+            response = await forward_request(
+                mock_request, "get", "http://backend/itinerary", stream=True
+            )
+            with pytest.raises(httpx.ReadError):
+                async for _ in response.body_iterator:
+                    pass
+
+    assert backend_admission.in_flight == 0
+    assert all(stream.closed for stream in streams)
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_refuses_before_queueing_for_a_slot():
+    mock_request = AsyncMock(spec=Request)
+    mock_request.body.return_value = b""
+    mock_request.query_params = {}
+    mock_request.cookies = {}
+
+    with patch.object(backend_breaker, "state", OPEN), patch.object(
+        backend_breaker, "_opened_at", time.monotonic()
+    ), patch.object(
+        backend_admission, "in_flight", backend_admission.max_concurrent
+    ), patch("routes.request_forwarder.get_client"):
+        with pytest.raises(CircuitOpen):
+            await asyncio.wait_for(
+                forward_request(mock_request, "get", "http://backend/"), 1
+            )
+        assert backend_admission.stats()["queued"] == 0
+
+
+def test_filter_headers_drops_connection_tokens():
+    headers = {
+        "Connection": "close, X-Internal",
+        "X-Internal": "secret",
+        "Content-Type": "application/json",
+    }
+
+    assert filter_headers(headers) == {"Content-Type": "application/json"}
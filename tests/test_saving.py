@@ -1,4 +1,11 @@
-from utils.utils import create_trip_data
+from utils.utils import (
+    create_trip_data,
+    activity_to_itinerary,
+    itinerary_to_activity,
+    activities_to_itineraries,
+    itineraries_to_activities,
+)
+from models.models import ItineraryItem
 from _datetime import datetime
 
 
@@ -11,3 +18,43 @@ def test_create_trip_data():
             and trip.city == "London"
             and trip.time_of_day == "Afternoon,Evening"
             and trip.group == "Couple")
+
+
+def test_bulk_conversions_match_single_conversions():
+    items = [
+        ItineraryItem(
+            title="Museum",
+            transport=False,
+            start="10:00",
+            end="12:00",
+            description="Dinosaurs",
+            price=0,
+            theme="Culture",
+            transportMode="N/A",
+            requires_booking=True,
+            image_link=["a.jpg", "b.jpg"],
+            duration=120,
+            id=1,
+            latitude=51.49,
+        ),
+        ItineraryItem(
+            title="Bus",
+            transport=True,
+            start="12:00",
+            end="12:20",
+            description="Number 9",
+            price=1.75,
+            theme="Transport",
+            transportMode="Bus",
+            requires_booking=False,
+            duration=20,
+            id=2,
+        ),
+    ]
+
+    rows = itineraries_to_activities(items)
+
+    assert rows == [itinerary_to_activity(item).model_dump() for item in items]
+    assert activities_to_itineraries(rows) == [
+        activity_to_itinerary(row).model_dump() for row in rows
+    ]
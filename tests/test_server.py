@@ -0,0 +1,45 @@
+import pytest
+from unittest.mock import mock_open, patch
+
+import server
+
+
+def test_worker_count_defaults_to_available_cpus():
+    with patch.object(server, "WEB_CONCURRENCY", 0), patch.object(
+        server, "available_cpus", return_value=6
+    ):
+        assert server.worker_count() == 6
+
+    with patch.object(server, "WEB_CONCURRENCY", 3):
+        assert server.worker_count() == 3
+
+
+def test_available_cpus_honours_cgroup_quota():
+    with patch("os.sched_getaffinity", return_value=set(range(16))), patch(
+        "builtins.open", mock_open(read_data="250000 100000\n")
+    ):
+        assert server.available_cpus() == 3
+
+    with patch("os.sched_getaffinity", return_value=set(range(16))), patch(
+        "builtins.open", mock_open(read_data="max 100000\n")
+    ):
+        assert server.available_cpus() == 16
+
+
+def test_several_workers_need_a_shared_trip_cache():
+    with patch.object(server, "TRIP_CACHE_TTL", 300), patch.object(
+        server, "TRIP_CACHE_URL", ""
+    ):
+        server.check_trip_cache(1)
+        with pytest.raises(SystemExit, match="TRIP_CACHE_URL"):
+            server.check_trip_cache(4)
+
+    with patch.object(server, "TRIP_CACHE_TTL", 0), patch.object(
+        server, "TRIP_CACHE_URL", ""
+    ):
+        server.check_trip_cache(4)
+
+    with patch.object(server, "TRIP_CACHE_TTL", 300), patch.object(
+        server, "TRIP_CACHE_URL", "redis://cache:6379"
+    ):
+        server.check_trip_cache(4)
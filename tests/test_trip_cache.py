@@ -0,0 +1,46 @@
+import pytest
+from utils.trip_cache import MemoryTripStore, RedisTripStore, TripCache
+
+
+class FakeRedis:
+    """Local stand-in for the subset of redis.asyncio the cache uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiries = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiries[key] = ex
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "store",
+    [MemoryTripStore(1024 * 1024), RedisTripStore(FakeRedis())],
+    ids=["memory", "redis"],
+)
+async def test_invalidation_only_affects_that_user(store):
+    cache = TripCache(store, ttl=60)
+    alice = await cache.key("alice", "list")
+    bob = await cache.key("bob", "list")
+    await cache.set(alice, b"alice trips")
+    await cache.set(bob, b"bob trips")
+
+    await cache.invalidate_user("alice")
+
+    assert await cache.get(await cache.key("alice", "list")) is None
+    assert await cache.get(await cache.key("bob", "list")) == b"bob trips"
+
+
+@pytest.mark.asyncio
+async def test_redis_entries_expire():
+    redis = FakeRedis()
+    cache = TripCache(RedisTripStore(redis), ttl=30)
+
+    await cache.set(await cache.key("alice", "list"), b"trips")
+
+    assert sorted(redis.expiries.values()) == [30, 60]
@@ -0,0 +1,500 @@
+import pytest
+import orjson
+import re
+from fastapi import HTTPException
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from routes import saving
+from models.models import (
+    BulkTripRequest,
+    FullItinerary,
+    ItineraryItem,
+    ItineraryPatch,
+    Trip,
+    TripRequest,
+)
+from utils.database import ACTIVITIES_BATCH_SIZE, TripsRepository
+from utils.trip_cache import MemoryTripStore, TripCache
+from utils.utils import itinerary_to_activity
+
+
+@pytest.fixture(autouse=True)
+def trip_cache():
+    """A fresh in-process cache per test, off unless a test turns it on."""
+    cache = TripCache(MemoryTripStore(1024 * 1024), ttl=0)
+    with patch("routes.saving.get_trip_cache", return_value=cache):
+        yield cache
+
+
+def make_item(item_id, **fields):
+    item = {
+        "id": item_id,
+        "title": f"Activity {item_id}",
+        "transport": False,
+        "start": "09:00",
+        "end": "10:00",
+        "description": "",
+        "price": 0.0,
+        "theme": "Culture",
+        "transportMode": "Walking",
+        "requires_booking": False,
+        "duration": 60,
+    }
+    return ItineraryItem(**{**item, **fields})
+
+
+class FakeQuery:
+    """Just enough of the postgrest query builder to serve fixed rows."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.columns = "*"
+        self.ordering = []
+        self.row_limit = None
+
+    def select(self, columns="*"):
+        self.columns = columns
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def or_(self, condition):
+        # Only the keyset condition built by get_trips is understood
+        date_created, trip_id = re.fullmatch(
+            r"date_created\.lt\.(.+),and\(date_created\.eq\.\1,"
+            r"trip_id\.lt\.(.+)\)",
+            condition,
+        ).groups()
+        self.filters.append(
+            lambda row: (row["date_created"], row["trip_id"])
+            < (date_created, trip_id)
+        )
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    async def execute(self):
+        self.db.round_trips += 1
+        self.db.selects.append(self.columns)
+        rows = [
+            dict(row)
+            for row in self.db.rows[self.table]
+            if all(match(row) for match in self.filters)
+        ]
+        for column, desc in reversed(self.ordering):
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        if self.row_limit is not None:
+            rows = rows[: self.row_limit]
+        if self.columns != "*":
+            columns = self.columns.split(",")
+            rows = [{name: row[name] for name in columns} for row in rows]
+        return SimpleNamespace(data=rows)
+
+
+class FakeRpc:
+    def __init__(self, db, function, params):
+        self.db = db
+        self.function = function
+        self.params = params
+
+    async def execute(self):
+        self.db.round_trips += 1
+        self.db.rpc_calls.append((self.function, self.params))
+        if self.function == "save_trip":
+            return SimpleNamespace(data=self.save_trip(**self.params))
+        if self.function == "save_trips":
+            trip_ids = [
+                self.save_trip(entry["trip"], entry["activities"])
+                for entry in self.params["p_trips"]
+            ]
+            return SimpleNamespace(data=trip_ids)
+        owned = any(
+            trip["trip_id"] == self.params.get("p_trip_id")
+            and trip["user_id"] == self.params.get("p_user_id")
+            for trip in self.db.rows["trips"]
+        )
+        if owned and self.function == "apply_trip_activity_changes":
+            self.apply_changes()
+        return SimpleNamespace(data=owned)
+
+    def save_trip(self, p_trip, p_activities):
+        trips = self.db.rows["trips"]
+        trip_id = f"00000000-0000-0000-0001-{len(trips):012d}"
+        trips.append({**p_trip, "trip_id": trip_id})
+        for activity in p_activities:
+            self.db.rows["activities"].append({**activity, "trip_id": trip_id})
+        return trip_id
+
+    def apply_changes(self):
+        # Delete, then update matching ids, then insert the rest, as the
+        # apply_trip_activity_changes function does
+        trip_id = self.params["p_trip_id"]
+        rows = [
+            row
+            for row in self.db.rows["activities"]
+            if row["trip_id"] != trip_id
+            or row["id"] not in self.params["p_deleted_ids"]
+        ]
+        kept = [row for row in rows if row["trip_id"] == trip_id]
+        existing = {row["id"] for row in kept}
+        for upsert in self.params["p_upserts"]:
+            if upsert["id"] in existing:
+                for row in kept:
+                    if row["id"] == upsert["id"]:
+                        row.update(upsert)
+            else:
+                rows.append({**upsert, "trip_id": trip_id})
+        self.db.rows["activities"] = rows
+
+
+class FakeSupabase:
+    def __init__(self, trip_count, activities_per_trip=3):
+        self.round_trips = 0
+        self.selects = []
+        self.rpc_calls = []
+        self.rows = {"trips": [], "activities": []}
+        for trip in range(trip_count):
+            self.rows["trips"].append(
+                {
+                    "trip_id": f"00000000-0000-0000-0000-{trip:012d}",
+                    "user_id": "user-1",
+                    "city": "London",
+                    "date_created": f"2025-01-{trip % 3 + 1:02d}",
+                    "time_of_day": "Morning,Evening",
+                }
+            )
+            for activity in range(activities_per_trip):
+                row = itinerary_to_activity(make_item(activity)).model_dump()
+                row["trip_id"] = f"00000000-0000-0000-0000-{trip:012d}"
+                self.rows["activities"].append(row)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, function, params):
+        return FakeRpc(self, function, params)
+
+
+async def get_trips(**params):
+    """Call GET /trips and decode the JSON body it responds with."""
+    response = await saving.get_trips(**params)
+    return orjson.loads(response.body)
+
+
+def use_database(db):
+    return patch(
+        "routes.saving.get_repository", return_value=TripsRepository(db)
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("trip_count", [1, 10, 50])
+async def test_get_trips_round_trips_do_not_grow_with_trip_count(
+    trip_count,
+):
+    db = FakeSupabase(trip_count)
+
+    with use_database(db):
+        response = await get_trips(user_id="user-1")
+
+    # One query for the trips and one batched query for their activities
+    assert db.round_trips == 2
+    assert len(response["trips"]) == trip_count
+    for trip in response["trips"]:
+        assert trip["timeOfDay"] == ["Morning", "Evening"]
+        assert [item["id"] for item in trip["itinerary"]] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_trips_batches_activity_queries():
+    db = FakeSupabase(ACTIVITIES_BATCH_SIZE + 1)
+
+    with use_database(db):
+        response = await get_trips(user_id="user-1")
+
+    assert db.round_trips == 3
+    assert all(len(trip["itinerary"]) == 3 for trip in response["trips"])
+
+
+@pytest.mark.asyncio
+async def test_get_trips_pages_through_every_trip_once():
+    db = FakeSupabase(7)
+    seen = []
+    cursor = None
+
+    with use_database(db):
+        while True:
+            response = await get_trips(
+                user_id="user-1", limit=3, cursor=cursor
+            )
+            seen.extend(trip["trip_id"] for trip in response["trips"])
+            cursor = response["next_cursor"]
+            if cursor is None:
+                break
+
+    assert sorted(seen) == sorted(row["trip_id"] for row in db.rows["trips"])
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.asyncio
+async def test_get_trips_summary_projects_fields_and_skips_activities():
+    db = FakeSupabase(5)
+
+    with use_database(db):
+        response = await get_trips(
+            user_id="user-1", fields="city", summary=True
+        )
+
+    assert db.round_trips == 1
+    assert db.selects == ["city,trip_id"]
+    assert response["trips"][0].keys() == {"city", "trip_id"}
+
+
+@pytest.mark.asyncio
+async def test_get_trips_rejects_unknown_fields_and_bad_cursors():
+    with pytest.raises(HTTPException) as error:
+        await saving.get_trips(user_id="user-1", fields="city,password")
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        await saving.get_trips(user_id="user-1", cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_delete_trip_is_a_single_round_trip():
+    db = FakeSupabase(1)
+    trip_id = db.rows["trips"][0]["trip_id"]
+
+    with use_database(db):
+        await saving.delete_trip(trip_id, user_id="user-1")
+
+    assert db.round_trips == 1
+    assert db.rpc_calls[0][0] == "delete_trip"
+
+
+@pytest.mark.asyncio
+async def test_edit_trip_writes_only_changed_activities():
+    db = FakeSupabase(1)
+    trip_id = db.rows["trips"][0]["trip_id"]
+    itinerary = [make_item(0), make_item(1, start="11:00"), make_item(5)]
+
+    with use_database(db):
+        await saving.edit_trip(
+            trip_id, FullItinerary(itinerary=itinerary), user_id="user-1"
+        )
+
+    function, params = db.rpc_calls[0]
+    assert function == "apply_trip_activity_changes"
+    assert [row["id"] for row in params["p_upserts"]] == [1, 5]
+    assert params["p_deleted_ids"] == [2]
+
+
+@pytest.mark.asyncio
+async def test_edit_trip_replaces_all_activities_if_stored_ids_repeat():
+    db = FakeSupabase(1)
+    trip_id = db.rows["trips"][0]["trip_id"]
+    db.rows["activities"].append(dict(db.rows["activities"][0]))
+    itinerary = [make_item(0), make_item(1), make_item(2)]
+
+    with use_database(db):
+        await saving.edit_trip(
+            trip_id, FullItinerary(itinerary=itinerary), user_id="user-1"
+        )
+
+    _, params = db.rpc_calls[0]
+    assert [row["id"] for row in params["p_upserts"]] == [0, 1, 2]
+    assert sorted(params["p_deleted_ids"]) == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_trip_saved_with_duplicate_ids_can_be_put_back():
+    db = FakeSupabase(0)
+    itinerary = [make_item(1), make_item(1, title="Lunch")]
+
+    with use_database(db):
+        saved = await saving.save_trip(
+            FullItinerary(itinerary=itinerary),
+            user_id="user-1",
+            searchConfig=None,
+        )
+        itinerary[1] = make_item(1, title="Dinner")
+        await saving.edit_trip(
+            saved["trip_id"],
+            FullItinerary(itinerary=itinerary),
+            user_id="user-1",
+        )
+
+    titles = [row["title"] for row in db.rows["activities"]]
+    assert titles == ["Activity 1", "Dinner"]
+
+
+@pytest.mark.asyncio
+async def test_patch_trip_merges_partial_changes():
+    db = FakeSupabase(1)
+    trip_id = db.rows["trips"][0]["trip_id"]
+    patch_request = ItineraryPatch.model_validate(
+        {"items": [{"id": 1, "price": 12.5}], "removed": [0]}
+    )
+
+    with use_database(db):
+        await saving.patch_trip(trip_id, patch_request, user_id="user-1")
+
+    _, params = db.rpc_calls[0]
+    assert params["p_upserts"] == [
+        {**itinerary_to_activity(make_item(1)).model_dump(), "price": 12.5}
+    ]
+    assert params["p_deleted_ids"] == [0]
+
+
+@pytest.mark.asyncio
+async def test_patch_trip_rejects_incomplete_new_items():
+    db = FakeSupabase(1)
+    trip_id = db.rows["trips"][0]["trip_id"]
+    patch_request = ItineraryPatch.model_validate(
+        {"items": [{"id": 9, "title": "New"}]}
+    )
+
+    with use_database(db), pytest.raises(HTTPException) as error:
+        await saving.patch_trip(trip_id, patch_request, user_id="user-1")
+
+    assert error.value.status_code == 422
+    assert db.rpc_calls == []
+
+
+@pytest.mark.asyncio
+async def test_edit_trip_of_another_user_is_not_found():
+    db = FakeSupabase(1)
+    trip_id = db.rows["trips"][0]["trip_id"]
+
+    with use_database(db), pytest.raises(HTTPException) as error:
+        await saving.edit_trip(
+            trip_id, FullItinerary(itinerary=[]), user_id="user-2"
+        )
+
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_trips_are_cached_until_the_user_writes(trip_cache):
+    trip_cache.ttl = 60
+    db = FakeSupabase(2)
+    trip_id = db.rows["trips"][0]["trip_id"]
+
+    with use_database(db):
+        first = await saving.get_trips(user_id="user-1")
+        cached = await saving.get_trips(user_id="user-1")
+        assert db.round_trips == 2
+        assert cached.body == first.body
+
+        await saving.delete_trip(trip_id, user_id="user-1")
+        await saving.get_trips(user_id="user-1")
+
+    assert db.round_trips == 5
+
+
+class BrokenStore:
+    async def get(self, key):
+        raise ConnectionError("cache down")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionError("cache down")
+
+
+@pytest.mark.asyncio
+async def test_failing_trip_cache_is_logged_and_bypassed(trip_cache, caplog):
+    trip_cache.ttl = 60
+    trip_cache.store = BrokenStore()
+    db = FakeSupabase(1)
+    trip_id = db.rows["trips"][0]["trip_id"]
+
+    with use_database(db):
+        response = await saving.get_trips(user_id="user-1")
+        await saving.delete_trip(trip_id, user_id="user-1")
+
+    assert response.status_code == 200
+    warnings = [
+        record for record in caplog.records if record.name == "routes.saving"
+    ]
+    assert [record.getMessage() for record in warnings] == [
+        "Trip cache unavailable",
+        "Failed to invalidate cached trips for user-1",
+    ]
+    assert all(record.exc_info for record in warnings)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cache_ttl", [0, 60])
+async def test_matching_etag_gets_a_304(trip_cache, cache_ttl):
+    trip_cache.ttl = cache_ttl
+    db = FakeSupabase(2)
+
+    with use_database(db):
+        first = await saving.get_trips(user_id="user-1")
+        etag = first.headers["etag"]
+        unchanged = await saving.get_trips(
+            user_id="user-1", if_none_match=f'W/"stale", {etag}'
+        )
+        changed = await saving.get_trips(
+            user_id="user-1", if_none_match='"stale"'
+        )
+
+    assert unchanged.status_code == 304 and unchanged.body == b""
+    assert changed.status_code == 200 and changed.body == first.body
+    assert changed.headers["etag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_bulk_save_is_a_single_round_trip():
+    db = FakeSupabase(0)
+    activity = itinerary_to_activity(make_item(0))
+    trips = [
+        TripRequest(
+            trip=Trip(
+                city=city,
+                custom_name=f"Trip to {city}",
+                date_created="2025-02-01",
+                time_of_day="Morning",
+                group="Solo",
+            ),
+            activities=[activity] * count,
+        )
+        for city, count in [("London", 2), ("Paris", 0), ("Rome", 3)]
+    ]
+
+    with use_database(db):
+        response = await saving.save_trips(
+            BulkTripRequest(trips=trips), user_id="user-1"
+        )
+
+    trip_ids = [f"00000000-0000-0000-0001-{n:012d}" for n in range(3)]
+    assert db.round_trips == 1
+    assert db.rpc_calls[0][0] == "save_trips"
+    assert response["trip_ids"] == trip_ids
+    assert [row["city"] for row in db.rows["trips"]] == [
+        "London",
+        "Paris",
+        "Rome",
+    ]
+    assert [row["trip_id"] for row in db.rows["activities"]] == [
+        trip_ids[0],
+        trip_ids[0],
+        trip_ids[2],
+        trip_ids[2],
+        trip_ids[2],
+    ]
@@ -0,0 +1,152 @@
+"""Admission control for requests to a slow upstream."""
+
+import asyncio
+import heapq
+import itertools
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+from fastapi import HTTPException
+
+# Every controller registers itself here so its counters can be reported
+CONTROLLERS: Dict[str, "AdmissionController"] = {}
+
+# Request priorities; lower values are admitted first
+HIGH, NORMAL, LOW = 0, 1, 2
+
+
+class Overloaded(HTTPException):
+    """The upstream is at capacity and the request was shed."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"{name} is overloaded, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, prioritized wait queue.
+
+    Up to `max_concurrent` requests run at once. Further requests wait
+    for a slot, highest priority first, for at most `queue_timeout`
+    seconds; once `max_queue` are waiting, new ones are rejected at once.
+    Either way the caller gets a 503 with Retry-After instead of piling
+    up connections and memory behind a saturated upstream.
+
+    `reserved` slots are only given to HIGH priority requests, so cheap
+    calls still get through while long ones fill every other slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        reserved: int = 0,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.reserved = min(reserved, max_concurrent - 1)
+        self.in_flight = 0
+        self._queued = 0
+        # (priority, arrival order, future); cancelled entries are left in
+        # place and skipped when they reach the top
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        CONTROLLERS[name] = self
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _limit(self, priority: int) -> int:
+        if priority == HIGH:
+            return self.max_concurrent
+        return self.max_concurrent - self.reserved
+
+    def _first_waiter(self):
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return self._waiters[0] if self._waiters else None
+
+    def _can_start(self, priority: int) -> bool:
+        waiter = self._first_waiter()
+        if waiter is not None and waiter[0] <= priority:
+            # Never overtake a waiter of the same or higher priority
+            return False
+        return self.in_flight < self._limit(priority)
+
+    async def acquire(self, priority: int = NORMAL) -> None:
+        """Take a slot, waiting for one if needed, or raise Overloaded."""
+        if self._can_start(priority):
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # A slot was handed over just as the wait ended
+                self.release()
+            else:
+                future.cancel()
+                self._queued -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Overloaded(self.name, self.retry_after) from None
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Free a slot, handing it to the first waiter that may use it."""
+        self.in_flight -= 1
+        waiter = self._first_waiter()
+        if waiter is not None and self.in_flight < self._limit(waiter[0]):
+            heapq.heappop(self._waiters)
+            self._queued -= 1
+            self.in_flight += 1
+            waiter[2].set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, priority: int = NORMAL) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "reserved": self.reserved,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+def admission_stats() -> dict:
+    """Snapshot of every registered controller."""
+    return {
+        name: controller.stats() for name, controller in CONTROLLERS.items()
+    }
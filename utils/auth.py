@@ -0,0 +1,86 @@
+"""Token validation against the auth service with a short-lived cache."""
+
+import hashlib
+from fastapi import HTTPException
+from config import (
+    AUTH_URL,
+    AUTH_SLOW_CALL_SECONDS,
+    HEDGE_REQUESTS,
+    AUTH_CACHE_TTL,
+    AUTH_NEGATIVE_CACHE_TTL,
+    AUTH_CACHE_MAX_ENTRIES,
+)
+from utils.cache import TTLCache
+from utils.circuit_breaker import upstream_breaker
+from utils.http_client import get_client
+from utils.metrics import AUTH, timed
+
+# Cached in place of a user id when the auth service rejected the token
+REJECTED = False
+
+# Only these statuses mean the token itself is bad; anything else may be
+# a transient auth service failure and is not remembered
+REJECTED_STATUSES = frozenset({401, 403})
+
+auth_breaker = upstream_breaker("auth", AUTH_SLOW_CALL_SECONDS)
+
+token_cache = TTLCache(
+    name="auth",
+    ttl=AUTH_CACHE_TTL,
+    max_entries=AUTH_CACHE_MAX_ENTRIES,
+)
+
+
+def _token_key(token: str) -> str:
+    # Keep digests rather than the bearer tokens themselves in memory
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def _validate_upstream(token: str):
+    # Raises a 503 while the auth service is failing, which is not cached
+    with timed(AUTH):
+        response = await auth_breaker.call(
+            lambda: get_client().get(
+                f"{AUTH_URL}/validate", cookies={"token": token}
+            ),
+            hedge=HEDGE_REQUESTS,
+        )
+    if response.status_code == 200:
+        return response.json().get("user_id")
+    if response.status_code in REJECTED_STATUSES:
+        return REJECTED
+    return None
+
+
+async def validate_token(token: str) -> str:
+    """Return the user id for `token`, raising a 401 if it is not valid."""
+    key = _token_key(token)
+    user_id = token_cache.get(key)
+    if user_id is None:
+        user_id = await token_cache.load(
+            key,
+            lambda: _validate_upstream(token),
+            cacheable=bool,
+        )
+        if user_id is REJECTED:
+            # Remember rejections briefly so a bad cookie cannot hammer auth
+            token_cache.set(key, REJECTED, ttl=AUTH_NEGATIVE_CACHE_TTL)
+
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+
+def invalidate_token(token: str) -> None:
+    """Forget a token, e.g. after logout, so it is validated again."""
+    token_cache.invalidate(_token_key(token))
+
+
+def invalidate_user(user_id: str) -> None:
+    """Forget every cached token belonging to a user."""
+    token_cache.invalidate_where(lambda value: value == user_id)
+
+
+def clear_token_cache() -> None:
+    """Forget every cached token."""
+    token_cache.clear()
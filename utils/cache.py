@@ -0,0 +1,172 @@
+"""In-process TTL + LRU cache with request coalescing."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Every cache registers itself here so its counters can be reported
+CACHES: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Bounded cache with per-entry expiry and least-recently-used eviction.
+
+    Entries are bounded both by count and by an approximate memory budget.
+    Concurrent misses for the same key are coalesced so only one loader
+    runs and every caller receives its result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        CACHES[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        size: int = 1,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Store a value, evicting the least recently used entries to fit."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        if key in self._entries:
+            self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop every entry whose value matches `predicate`."""
+        for key, (_, _, value) in list(self._entries.items()):
+            if predicate(value):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+        self._bytes = 0
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        size_of: Callable[[Any], int] = lambda value: 1,
+        cacheable: Callable[[Any], bool] = lambda value: True,
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """Return the cached value or run `loader` once for all waiters."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        return await self.load(key, loader, size_of, cacheable, ttl)
+
+    async def load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        size_of: Callable[[Any], int] = lambda value: 1,
+        cacheable: Callable[[Any], bool] = lambda value: True,
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """Run `loader` and cache its result, joining a load already running."""
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            if cacheable(value):
+                self.set(key, value, size=size_of(value), ttl=ttl)
+            future.set_result(value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        """Counters used to size the cache and judge its hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+def cache_stats() -> dict:
+    """Stats for every registered cache, keyed by name."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -0,0 +1,286 @@
+"""Circuit breakers and hedged requests for calls to upstream services."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from fastapi import HTTPException
+from config import (
+    BREAKER_FAILURE_RATE,
+    BREAKER_SLOW_CALL_RATE,
+    BREAKER_MIN_CALLS,
+    BREAKER_WINDOW,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_HALF_OPEN_CALLS,
+    HEDGE_QUANTILE,
+    HEDGE_MIN_DELAY,
+)
+
+T = TypeVar("T")
+
+# Every breaker registers itself here so its state can be reported
+BREAKERS: Dict[str, "CircuitBreaker"] = {}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Successful call durations kept for the hedge delay
+LATENCY_SAMPLES = 200
+# Requests are not hedged until this many durations are known
+MIN_LATENCY_SAMPLES = 20
+
+
+class CircuitOpen(HTTPException):
+    """The upstream is failing and calls to it are being refused."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"{name} is unavailable, retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def _is_server_error(result: Any) -> bool:
+    return getattr(result, "status_code", 200) >= 500
+
+
+class CircuitBreaker:
+    """Stop calling an upstream that is failing or too slow.
+
+    Outcomes of the last `window` calls are kept. Once at least
+    `min_calls` are recorded and the share of failures reaches
+    `failure_rate`, or the share of calls slower than `slow_call_seconds`
+    reaches `slow_call_rate`, the breaker opens and calls fail at once
+    with a 503 for `open_seconds`. It then lets `half_open_calls` probes
+    through: if they all succeed it closes again, any failure reopens it.
+
+    Exceptions and results that `is_failure` accepts, by default any 5xx
+    response, count as failures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_rate: float = 1.0,
+        slow_call_seconds: float = math.inf,
+        min_calls: int = 20,
+        window: int = 50,
+        open_seconds: float = 30,
+        half_open_calls: int = 3,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+        is_failure: Callable[[Any], bool] = _is_server_error,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.is_failure = is_failure
+        self.state = CLOSED
+        # (failed, slow) per call, newest last
+        self._outcomes: deque = deque(maxlen=window)
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.rejected = 0
+        self.opened = 0
+        self.hedged = 0
+        BREAKERS[name] = self
+
+    def fail_fast(self) -> None:
+        """Raise CircuitOpen while open, without taking a half-open probe.
+
+        Lets callers refuse a request before queueing it for a slot.
+        """
+        if self.state == OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpen(self.name, remaining)
+
+    def check(self) -> bool:
+        """Raise CircuitOpen if calls are refused; True for a probe call."""
+        self.fail_fast()
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            self._probes = self._probe_successes = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.open_seconds)
+            self._probes += 1
+            return True
+        return False
+
+    def record(
+        self,
+        failed: bool,
+        seconds: float,
+        probe: bool = False,
+        sample_latency: bool = True,
+    ):
+        """Count the outcome of a call allowed by `check`.
+
+        Only calls with `sample_latency` feed the hedge delay, so slow
+        calls that are never hedged do not hold it up.
+        """
+        slow = seconds >= self.slow_call_seconds
+        if not failed and sample_latency:
+            self._latencies.append(seconds)
+
+        if self.state == HALF_OPEN:
+            # Calls started before the breaker opened do not count
+            if not probe:
+                return
+            if failed or slow:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+        if self.state == OPEN:
+            return
+
+        self._outcomes.append((failed, slow))
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow_calls = sum(1 for _, slow in self._outcomes if slow)
+        if (
+            failures >= self.failure_rate * calls
+            or slow_calls >= self.slow_call_rate * calls
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging: a high quantile of latency.
+
+        None until enough calls have succeeded to estimate it.
+        """
+        if len(self._latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        latencies = sorted(self._latencies)
+        index = math.ceil(self.hedge_quantile * len(latencies)) - 1
+        return max(self.hedge_min_delay, latencies[max(index, 0)])
+
+    async def call(
+        self,
+        send: Callable[[], Awaitable[T]],
+        hedge: bool = False,
+        sample_latency: bool = True,
+    ) -> T:
+        """Run `send` through the breaker, hedging it if asked to.
+
+        Only hedge idempotent requests, since both attempts may reach the
+        upstream. Pass `sample_latency=False` for calls that are never
+        hedged and may be much slower, so they do not set the hedge delay.
+        """
+        probe = self.check()
+        delay = self.hedge_delay() if hedge and not probe else None
+        start = time.monotonic()
+        try:
+            if delay is not None:
+                result = await hedged(send, delay, self)
+            else:
+                result = await send()
+        except asyncio.CancelledError:
+            # An abandoned probe must not use up the half-open allowance
+            if probe and self.state == HALF_OPEN:
+                self._probes -= 1
+            raise
+        except Exception:
+            self.record(True, time.monotonic() - start, probe)
+            raise
+        self.record(
+            self.is_failure(result),
+            time.monotonic() - start,
+            probe,
+            sample_latency,
+        )
+        return result
+
+    def stats(self) -> dict:
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": failures,
+            "hedge_delay": self.hedge_delay(),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "hedged": self.hedged,
+        }
+
+
+async def hedged(
+    send: Callable[[], Awaitable[T]],
+    delay: float,
+    breaker: Optional[CircuitBreaker] = None,
+) -> T:
+    """Return the first successful result of `send`, started twice.
+
+    The second attempt starts only if the first has not finished after
+    `delay` seconds, so a slow replica costs at most `delay` extra rather
+    than the full timeout. Whichever attempt loses is cancelled.
+    """
+    pending = {asyncio.ensure_future(send())}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return done.pop().result()
+
+        if breaker is not None:
+            breaker.hedged += 1
+        pending.add(asyncio.ensure_future(send()))
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def upstream_breaker(name: str, slow_call_seconds: float) -> CircuitBreaker:
+    """A breaker with the configured thresholds."""
+    return CircuitBreaker(
+        name=name,
+        failure_rate=BREAKER_FAILURE_RATE,
+        slow_call_rate=BREAKER_SLOW_CALL_RATE,
+        slow_call_seconds=slow_call_seconds,
+        min_calls=BREAKER_MIN_CALLS,
+        window=BREAKER_WINDOW,
+        open_seconds=BREAKER_OPEN_SECONDS,
+        half_open_calls=BREAKER_HALF_OPEN_CALLS,
+        hedge_quantile=HEDGE_QUANTILE,
+        hedge_min_delay=HEDGE_MIN_DELAY,
+    )
+
+
+def breaker_stats() -> dict:
+    """Snapshot of every registered breaker."""
+    return {name: breaker.stats() for name, breaker in BREAKERS.items()}
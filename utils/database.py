@@ -0,0 +1,195 @@
+"""Async data access for trips and their activities in Supabase."""
+
+import asyncio
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from config import SUPABASE_URL, SUPABASE_KEY
+from utils.metrics import SUPABASE, timed
+
+# Trip ids per activities query, keeps the `in` filter within URL limits
+ACTIVITIES_BATCH_SIZE = 100
+
+_repository: Optional["TripsRepository"] = None
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+
+class TripsRepository:
+    """Queries against the `trips` and `activities` tables.
+
+    Every method awaits the async postgrest client, so a slow database
+    call only suspends its own request instead of the whole worker.
+    """
+
+    def __init__(self, client: "AsyncClient"):
+        self.client = client
+
+    async def _execute(self, query):
+        with timed(SUPABASE):
+            return await query.execute()
+
+    async def save_trip(self, trip: dict, activities: List[dict]) -> str:
+        """Insert a trip with its activities in one transaction."""
+        response = await self._execute(
+            self.client.rpc(
+                "save_trip", {"p_trip": trip, "p_activities": activities}
+            )
+        )
+        return response.data
+
+    async def save_trips(
+        self, trips: List[Tuple[dict, List[dict]]]
+    ) -> List[str]:
+        """Insert (trip, activities) pairs in one transaction.
+
+        Returns the new trip_ids in the order the trips were given.
+        """
+        response = await self._execute(
+            self.client.rpc(
+                "save_trips",
+                {
+                    "p_trips": [
+                        {"trip": trip, "activities": activities}
+                        for trip, activities in trips
+                    ]
+                },
+            )
+        )
+        return response.data or []
+
+    async def apply_activity_changes(
+        self,
+        trip_id: str,
+        user_id: str,
+        upserts: List[dict],
+        deleted_ids: List[int],
+    ) -> bool:
+        """Insert/update and delete activities in one transaction.
+
+        Returns False if the trip does not exist or belongs to someone
+        else.
+        """
+        response = await self._execute(
+            self.client.rpc(
+                "apply_trip_activity_changes",
+                {
+                    "p_trip_id": trip_id,
+                    "p_user_id": user_id,
+                    "p_upserts": upserts,
+                    "p_deleted_ids": deleted_ids,
+                },
+            )
+        )
+        return bool(response.data)
+
+    async def delete_trip(self, trip_id: str, user_id: str) -> bool:
+        """Delete a trip and its activities in one transaction.
+
+        Returns False if the trip does not exist or belongs to someone
+        else.
+        """
+        response = await self._execute(
+            self.client.rpc(
+                "delete_trip", {"p_trip_id": trip_id, "p_user_id": user_id}
+            )
+        )
+        return bool(response.data)
+
+    async def get_trip(
+        self, trip_id: str, user_id: str, columns: str = "*"
+    ) -> Optional[dict]:
+        """Return the trip if it exists and belongs to the user."""
+        response = await self._execute(
+            self.client.table("trips")
+            .select(columns)
+            .eq("trip_id", trip_id)
+            .eq("user_id", user_id)
+        )
+        return response.data[0] if response.data else None
+
+    async def list_trips(
+        self,
+        user_id: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> List[dict]:
+        """List a user's trips, newest first when paginated.
+
+        `after` is a (date_created, trip_id) keyset position. Callers
+        validate it, since it is interpolated into the filter.
+        """
+        query = (
+            self.client.table("trips")
+            .select(columns)
+            .eq("user_id", user_id)
+        )
+        if after is not None:
+            date_created, trip_id = after
+            query = query.or_(
+                f"date_created.lt.{date_created},"
+                f"and(date_created.eq.{date_created},"
+                f"trip_id.lt.{trip_id})"
+            )
+        if limit is not None:
+            query = (
+                query.order("date_created", desc=True)
+                .order("trip_id", desc=True)
+                .limit(limit)
+            )
+        response = await self._execute(query)
+        return response.data or []
+
+    async def get_activities(self, trip_id: str) -> List[dict]:
+        response = await self._execute(
+            self.client.table("activities").select("*").eq("trip_id", trip_id)
+        )
+        return response.data or []
+
+    async def list_activities(self, trip_ids: List[str]) -> List[dict]:
+        """Activities for many trips, querying batches of ids concurrently."""
+        size = ACTIVITIES_BATCH_SIZE
+        # Timed as one call, since the batches overlap
+        with timed(SUPABASE):
+            responses = await asyncio.gather(
+                *(
+                    self.client.table("activities")
+                    .select("*")
+                    .in_("trip_id", trip_ids[start : start + size])
+                    .execute()
+                    for start in range(0, len(trip_ids), size)
+                )
+            )
+        return [
+            activity
+            for response in responses
+            for activity in response.data or []
+        ]
+
+
+async def start_repository() -> TripsRepository:
+    """Connect to Supabase. Called from the app lifespan."""
+    global _repository
+    if _repository is None:
+        # Imported here since the supabase package is slow to import and
+        # only the lifespan needs it
+        from supabase import acreate_client
+
+        client = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+        _repository = TripsRepository(client)
+    return _repository
+
+
+async def close_repository() -> None:
+    """Close the postgrest session held by the Supabase client."""
+    global _repository
+    if _repository is not None:
+        await _repository.client.postgrest.aclose()
+        _repository = None
+
+
+def get_repository() -> TripsRepository:
+    """Return the repository opened by the app lifespan."""
+    if _repository is None:
+        raise RuntimeError("Supabase repository has not been started")
+    return _repository
@@ -0,0 +1,173 @@
+"""Cache of Google Directions results keyed on quantized coordinates."""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Sequence, Tuple
+import orjson
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Modes whose routes depend on the departure time
+TIME_SENSITIVE_MODES = frozenset({"transit"})
+
+# Expired rows are pruned from disk every this many writes
+DISK_PRUNE_INTERVAL = 500
+
+
+class DirectionsCache:
+    """In-memory LRU of routes with an optional SQLite tier.
+
+    Origins and destinations are rounded to `precision` decimal places so
+    requests for nearly the same spot, e.g. a popular activity, share an
+    entry. Transit routes expire sooner than walking or driving routes.
+    The disk tier is read on a memory miss and survives restarts. Its
+    database is opened on first use rather than at construction, and is
+    only touched from a worker thread so the event loop never waits on it.
+    It keeps the `disk_max_entries` most recently written routes. A
+    failing disk tier is logged and bypassed, never failing the lookup.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        transit_ttl: float,
+        precision: int = 4,
+        max_entries: int = 1024,
+        path: Optional[str] = None,
+        disk_max_entries: int = 100_000,
+    ):
+        self.ttl = ttl
+        self.transit_ttl = transit_ttl
+        self.precision = precision
+        self.memory = TTLCache(
+            name="directions", ttl=ttl, max_entries=max_entries
+        )
+        # Disk calls run in worker threads, which must not share the
+        # SQLite connection at once
+        self._lock = threading.Lock()
+        self.path = path
+        self.disk_max_entries = disk_max_entries
+        self._disk: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def key(
+        self, origin: Sequence[float], destination: Sequence[float], mode: str
+    ) -> Tuple:
+        """Cache key with both coordinates rounded to the precision."""
+        return (
+            tuple(round(coord, self.precision) for coord in origin),
+            tuple(round(coord, self.precision) for coord in destination),
+            mode,
+        )
+
+    def ttl_for(self, mode: str) -> float:
+        return self.transit_ttl if mode in TIME_SENSITIVE_MODES else self.ttl
+
+    async def get(self, key: Tuple) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or not self.path:
+            return value
+
+        try:
+            row = await asyncio.to_thread(self._read_disk, key)
+        except Exception:
+            logger.warning("Directions disk cache unavailable", exc_info=True)
+            return None
+        if row is None or row[0] <= time.time():
+            return None
+
+        value = orjson.loads(row[1])
+        self.memory.set(key, value, ttl=row[0] - time.time())
+        return value
+
+    async def set(self, key: Tuple, value: Any) -> None:
+        ttl = self.ttl_for(key[2])
+        self.memory.set(key, value, ttl=ttl)
+        if ttl > 0 and self.path:
+            try:
+                await asyncio.to_thread(self._write_disk, key, value, ttl)
+            except Exception:
+                logger.warning(
+                    "Directions disk cache unavailable", exc_info=True
+                )
+
+    async def clear(self) -> None:
+        self.memory.clear()
+        if self.path:
+            await asyncio.to_thread(self._clear_disk)
+
+    async def close(self) -> None:
+        """Close the disk tier; it is reopened if the cache is used again."""
+        await asyncio.to_thread(self._close_disk)
+
+    # The disk methods below block on SQLite and its fsync, so they run in
+    # a worker thread and share the connection under the lock
+
+    def _read_disk(self, key: Tuple) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            return self._open_disk().execute(
+                "SELECT expires_at, value FROM directions WHERE key = ?",
+                (orjson.dumps(key).decode(),),
+            ).fetchone()
+
+    def _write_disk(self, key: Tuple, value: Any, ttl: float) -> None:
+        with self._lock:
+            disk = self._open_disk()
+            # Commits both statements, or rolls back if either fails
+            with disk:
+                disk.execute(
+                    "INSERT OR REPLACE INTO directions VALUES (?, ?, ?)",
+                    (
+                        orjson.dumps(key).decode(),
+                        time.time() + ttl,
+                        orjson.dumps(value),
+                    ),
+                )
+                # REPLACE gives the row a new rowid, so the lowest rowids
+                # are the oldest writes
+                disk.execute(
+                    "DELETE FROM directions WHERE rowid <= "
+                    "(SELECT max(rowid) FROM directions) - ?",
+                    (self.disk_max_entries,),
+                )
+            self._writes += 1
+            if self._writes % DISK_PRUNE_INTERVAL == 0:
+                self._prune_disk()
+
+    def _clear_disk(self) -> None:
+        with self._lock:
+            disk = self._open_disk()
+            disk.execute("DELETE FROM directions")
+            disk.commit()
+
+    def _close_disk(self) -> None:
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def _open_disk(self) -> sqlite3.Connection:
+        # Called with the lock held, only when a path is set
+        if self._disk is None:
+            disk = sqlite3.connect(self.path, check_same_thread=False)
+            try:
+                disk.execute(
+                    "CREATE TABLE IF NOT EXISTS directions ("
+                    "key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+                )
+            except sqlite3.Error:
+                disk.close()
+                raise
+            self._disk = disk
+            self._prune_disk()
+        return self._disk
+
+    def _prune_disk(self) -> None:
+        self._disk.execute(
+            "DELETE FROM directions WHERE expires_at <= ?", (time.time(),)
+        )
+        self._disk.commit()
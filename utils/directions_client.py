@@ -0,0 +1,74 @@
+"""Async client for the Google Directions API."""
+
+import asyncio
+import random
+from typing import Optional
+import httpx
+from config import (
+    GOOGLE_DIRECTIONS_URL,
+    DIRECTIONS_TIMEOUT,
+    DIRECTIONS_MAX_RETRIES,
+    DIRECTIONS_RETRY_BACKOFF,
+    DIRECTIONS_MAX_CONCURRENCY,
+)
+from utils.http_client import get_client
+from utils.metrics import GOOGLE_DIRECTIONS, timed
+
+# HTTP statuses worth retrying; anything else is returned as is
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Directions API statuses that describe a transient failure
+RETRY_API_STATUSES = frozenset({"UNKNOWN_ERROR", "OVER_QUERY_LIMIT"})
+
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+class DirectionsError(Exception):
+    """The Directions API could not be reached after every retry."""
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Created lazily so it binds to the running event loop
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(DIRECTIONS_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, DIRECTIONS_RETRY_BACKOFF * 2**attempt)
+
+
+async def fetch_directions(params: dict) -> dict:
+    """Call the Directions API, retrying transient failures.
+
+    At most DIRECTIONS_MAX_CONCURRENCY calls are in flight at once, so a
+    burst of lookups queues here instead of exhausting the shared pool.
+    """
+    client = get_client()
+    for attempt in range(DIRECTIONS_MAX_RETRIES + 1):
+        last_attempt = attempt == DIRECTIONS_MAX_RETRIES
+        try:
+            async with _get_semaphore():
+                with timed(GOOGLE_DIRECTIONS):
+                    response = await client.get(
+                        GOOGLE_DIRECTIONS_URL,
+                        params=params,
+                        timeout=DIRECTIONS_TIMEOUT,
+                    )
+        except httpx.TransportError as e:
+            if last_attempt:
+                raise DirectionsError(str(e)) from e
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                data = response.json()
+                transient = data.get("status") in RETRY_API_STATUSES
+                if last_attempt or not transient:
+                    return data
+            elif last_attempt:
+                raise DirectionsError(
+                    f"Directions API returned {response.status_code}"
+                )
+
+        await asyncio.sleep(_backoff(attempt))
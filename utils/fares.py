@@ -0,0 +1,152 @@
+"""Fare estimates for directions legs, costed in bulk with NumPy."""
+
+import json
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+# Taxi fare data
+TAXI_FARES = {
+    "New York City": {"base_fare": 3.00, "per_km": 1.50},
+    "London": {"base_fare": 3.20, "per_km": 2.00},
+    "San Francisco": {"base_fare": 3.50, "per_km": 2.25},
+}
+
+# Public transport fare data
+PUBLIC_TRANSIT_FARES = {
+    "New York City": {"bus": 2.75, "subway": 2.75},
+    "London": {"bus": 1.75, "subway": 2.40},
+    "San Francisco": {"bus": 3.00, "subway": 3.50},
+}
+
+# Transit vehicle types charged the bus fare; every other vehicle type is
+# charged the subway fare
+BUS_VEHICLE_TYPES = frozenset({"BUS", "INTERCITY_BUS", "TROLLEYBUS"})
+
+WALKING, DRIVING, TRANSIT = 0, 1, 2
+MODE_CODES = {
+    "walking": WALKING,
+    "bicycling": WALKING,
+    "driving": DRIVING,
+    "transit": TRANSIT,
+}
+
+
+class FareTables:
+    """Per-city fares laid out as arrays indexed by city.
+
+    Cities missing a fare have NaN in its column, so legs in them cost
+    NaN and are reported as unknown rather than free.
+    """
+
+    def __init__(self, taxi: Dict[str, dict], transit: Dict[str, dict]):
+        cities = sorted(set(taxi) | set(transit))
+        self.city_index = {
+            city.casefold(): index for index, city in enumerate(cities)
+        }
+
+        def column(table, city, name):
+            return table.get(city, {}).get(name, np.nan)
+
+        self.taxi_base = np.array(
+            [column(taxi, city, "base_fare") for city in cities]
+        )
+        self.taxi_per_km = np.array(
+            [column(taxi, city, "per_km") for city in cities]
+        )
+        self.bus = np.array([column(transit, city, "bus") for city in cities])
+        self.subway = np.array(
+            [column(transit, city, "subway") for city in cities]
+        )
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "FareTables":
+        """Built-in tables, extended or overridden by a JSON data file.
+
+        The file holds `{"taxi": {city: {...}}, "transit": {city: {...}}}`
+        using the same keys as TAXI_FARES and PUBLIC_TRANSIT_FARES.
+        """
+        taxi = dict(TAXI_FARES)
+        transit = dict(PUBLIC_TRANSIT_FARES)
+        if path:
+            with open(path) as file:
+                data = json.load(file)
+            taxi.update(data.get("taxi", {}))
+            transit.update(data.get("transit", {}))
+        return cls(taxi, transit)
+
+    def estimate(
+        self,
+        cities: Iterable[Optional[str]],
+        modes: Iterable[str],
+        distances_km: Iterable[float],
+        bus_rides: Iterable[int],
+        rail_rides: Iterable[int],
+    ) -> np.ndarray:
+        """Cost every leg at once. Unknown cities or modes cost NaN."""
+        city_ids = np.array(
+            [
+                self.city_index.get((city or "").casefold(), -1)
+                for city in cities
+            ]
+        )
+        mode_codes = np.array([MODE_CODES.get(mode, -1) for mode in modes])
+        distances = np.asarray(list(distances_km), dtype=float)
+        bus_rides = np.asarray(list(bus_rides), dtype=float)
+        rail_rides = np.asarray(list(rail_rides), dtype=float)
+        if len(city_ids) == 0:
+            return np.zeros(0)
+
+        known = city_ids >= 0
+        index = np.where(known, city_ids, 0)
+
+        taxi = self.taxi_base[index] + self.taxi_per_km[index] * distances
+        transit = self.bus[index] * bus_rides + self.subway[index] * rail_rides
+        # Walking costs nothing, but a transit leg with no rides is a walk
+        transit = np.where(bus_rides + rail_rides > 0, transit, 0.0)
+
+        fares = np.select(
+            [
+                mode_codes == WALKING,
+                mode_codes == DRIVING,
+                mode_codes == TRANSIT,
+            ],
+            [0.0, taxi, transit],
+            default=np.nan,
+        )
+        return np.where(known | (mode_codes == WALKING), fares, np.nan)
+
+
+def count_rides(transit_steps: Iterable[dict]):
+    """Number of (bus, rail) rides in a route's transit steps."""
+    bus = rail = 0
+    for step in transit_steps:
+        if step.get("type") in BUS_VEHICLE_TYPES:
+            bus += 1
+        else:
+            rail += 1
+    return bus, rail
+
+
+def estimate_leg_fares(tables: FareTables, legs: List[dict]) -> List:
+    """Fare of each leg, rounded to pence/cents, or None if unknown.
+
+    Legs carry `city`, `mode`, `distance_km` and `transit_steps` as
+    extracted from the Directions API.
+    """
+    rides = [count_rides(leg.get("transit_steps") or []) for leg in legs]
+    fares = tables.estimate(
+        (leg.get("city") for leg in legs),
+        (leg.get("mode") for leg in legs),
+        (leg.get("distance_km") or 0.0 for leg in legs),
+        (bus for bus, _ in rides),
+        (rail for _, rail in rides),
+    )
+    return [
+        None if np.isnan(fare) else round(float(fare), 2) for fare in fares
+    ]
+
+
+def total_fare(fares: Iterable[Optional[float]]) -> Optional[float]:
+    """Sum of the known fares, or None if none are known."""
+    known = [fare for fare in fares if fare is not None]
+    return round(sum(known), 2) if known else None
@@ -0,0 +1,117 @@
+"""Shared, pooled HTTP client used for all outbound requests."""
+
+import logging
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Optional
+import httpx
+from config import (
+    MAX_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP2_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+class _NoStoreCookiePolicy(DefaultCookiePolicy):
+    """Never keep response cookies on the shared client.
+
+    The client is shared between users, so a cookie set by one upstream
+    response must not be replayed on another user's request. Cookies are
+    passed explicitly per request instead.
+    """
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_client() -> httpx.AsyncClient:
+    """Create a client with the configured pool limits."""
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = HTTP2_ENABLED and _http2_available()
+    if HTTP2_ENABLED and not http2:
+        logger.warning(
+            "HTTP2_ENABLED is set but h2 is not installed, using HTTP/1.1"
+        )
+
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=http2,
+        timeout=MAX_TIMEOUT,
+        cookies=CookieJar(policy=_NoStoreCookiePolicy()),
+    )
+
+
+async def start_client() -> httpx.AsyncClient:
+    """Open the shared client. Called from the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and drop all pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it if the lifespan has not run."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+def pool_stats() -> dict:
+    """Snapshot of the connection pool, used to size the limits."""
+    stats = {
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+        "http2": False,
+        "connections": 0,
+        "active": 0,
+        "idle": 0,
+        "pending_requests": 0,
+    }
+    if _client is None or _client.is_closed:
+        return stats
+
+    # httpx does not expose pool state publicly, so read it from httpcore
+    pool = getattr(_client._transport, "_pool", None)
+    if pool is None:
+        return stats
+
+    stats["http2"] = getattr(pool, "_http2", False)
+    connections = list(getattr(pool, "connections", []))
+    stats["connections"] = len(connections)
+    stats["idle"] = sum(1 for conn in connections if conn.is_idle())
+    stats["active"] = sum(
+        1 for conn in connections if not conn.is_idle() and not conn.is_closed()
+    )
+    requests = getattr(pool, "_requests", [])
+    stats["pending_requests"] = sum(
+        1 for request in requests if request.is_queued()
+    )
+    return stats
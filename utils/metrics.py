@@ -0,0 +1,201 @@
+"""Request and upstream latency metrics in the Prometheus text format."""
+
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+# Every histogram registers itself here so /metrics can render it
+METRICS: Dict[str, "Histogram"] = {}
+
+# Upper bounds in seconds, from a warm cache hit to a slow upstream call
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# Time spent in each upstream by the current request, for Server-Timing.
+# Set per request by the middleware; tasks spawned by the request get a
+# copy of the context that still points at the same dict
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names.
+
+    Counters are per process. Each worker serves its own /metrics, so
+    scrape every worker or aggregate them in Prometheus.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        METRICS[name] = self
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = [[0] * len(self.buckets), 0.0, 0]
+            self._series[labels] = series
+        index = bisect.bisect_left(self.buckets, seconds)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += seconds
+        series[2] += 1
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def _labels(self, values: Tuple[str, ...], **extra: str) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (
+            (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for name, value in pairs
+        )
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = self._labels(labels, le=repr(float(bound)))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = self._labels(labels, le="+Inf")
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {total}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {count}")
+        return "\n".join(lines)
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce the response headers, by route template.",
+    ("method", "route", "status"),
+)
+
+upstream_latency = Histogram(
+    "upstream_request_duration_seconds",
+    "Time spent waiting on each upstream dependency.",
+    ("component",),
+)
+
+# Components timed with `timed`, also the names used in Server-Timing
+AUTH = "auth"
+SUPABASE = "supabase"
+BACKEND = "backend"
+GOOGLE_DIRECTIONS = "google"
+
+
+@contextmanager
+def timed(component: str) -> Iterator[None]:
+    """Time a block of upstream work under `component`.
+
+    Recorded in the upstream histogram and, inside a request, added to
+    the request's Server-Timing breakdown. Failed calls are timed too.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        upstream_latency.observe(elapsed, component)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[component] = timings.get(component, 0.0) + elapsed
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    """Server-Timing header value, with durations in milliseconds."""
+    entries = [
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+    ]
+    entries.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """Time every HTTP request and add a Server-Timing header.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streamed responses are
+    passed through untouched. Latency is measured up to the response
+    headers; for streamed responses that is the time to first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        responded = False
+
+        async def send_with_timing(message):
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+                elapsed = time.perf_counter() - start
+                self._record(scope, message["status"], elapsed)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (
+                        b"server-timing",
+                        server_timing(timings, elapsed).encode(),
+                    )
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Nothing was sent, e.g. the app raised before responding
+            if not responded:
+                self._record(scope, 500, time.perf_counter() - start)
+            _request_timings.reset(token)
+
+    @staticmethod
+    def _record(scope, status: int, elapsed: float) -> None:
+        # The route template rather than the raw path keeps labels bounded
+        route = scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        request_latency.observe(elapsed, scope["method"], path, str(status))
+
+
+def render_metrics() -> str:
+    """Every registered histogram in the Prometheus text format."""
+    return "\n".join(metric.render() for metric in METRICS.values()) + "\n"
@@ -0,0 +1,80 @@
+"""Polyline formatting and simplification for directions responses."""
+
+from typing import List, Sequence, Tuple
+import numpy as np
+import polyline
+
+# Ways a route's polyline can be returned, chosen per request
+DECODED = "decoded"
+ENCODED = "encoded"
+POLYLINE_FORMATS = (DECODED, ENCODED)
+
+# Metres per degree of latitude, close enough for simplification
+METRES_PER_DEGREE = 111_320.0
+
+
+def _to_metres(points: np.ndarray) -> np.ndarray:
+    """Project (lat, lng) points onto a local flat plane in metres."""
+    scale = np.cos(np.radians(points[:, 0].mean()))
+    return np.column_stack(
+        (points[:, 1] * scale, points[:, 0])
+    ) * METRES_PER_DEGREE
+
+
+def simplify(
+    points: Sequence[Tuple[float, float]], tolerance: float
+) -> List[Tuple[float, float]]:
+    """Douglas-Peucker simplification keeping points within `tolerance` m.
+
+    Iterative, with the distances for each segment computed in one NumPy
+    pass, so long routes neither recurse deeply nor loop per point.
+    """
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+
+    xy = _to_metres(np.asarray(points, dtype=float))
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = xy[end] - xy[start]
+        offsets = xy[start + 1 : end] - xy[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            cross = segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]
+            distances = np.abs(cross) / length
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return [tuple(point) for point in np.asarray(points)[keep].tolist()]
+
+
+def format_polyline(
+    encoded: str, polyline_format: str = DECODED, tolerance: float = 0
+):
+    """Return an encoded polyline in the requested format.
+
+    The encoded form is already delta-encoded and quantized to 1e-5
+    degrees, so it is passed through untouched unless it is simplified.
+    """
+    if polyline_format == ENCODED and not tolerance:
+        return encoded
+
+    points = polyline.decode(encoded)
+    if tolerance:
+        points = simplify(points, tolerance)
+    if polyline_format == ENCODED:
+        return polyline.encode(points)
+    return points
@@ -0,0 +1,129 @@
+"""Per-user read-through cache of assembled trips responses."""
+
+import uuid
+from typing import Optional
+from config import TRIP_CACHE_TTL, TRIP_CACHE_MAX_BYTES, TRIP_CACHE_URL
+from utils.cache import TTLCache
+
+
+class MemoryTripStore:
+    """Process-local store, bounded by TRIP_CACHE_MAX_BYTES."""
+
+    def __init__(self, max_bytes: int):
+        self.cache = TTLCache(
+            name="trips", ttl=0, max_entries=100_000, max_bytes=max_bytes
+        )
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.cache.set(key, value, size=len(key) + len(value), ttl=ttl)
+
+
+class RedisTripStore:
+    """Store backed by any client with the redis.asyncio get/set API.
+
+    Memory is bounded by the server's maxmemory policy; every key is
+    written with an expiry.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(key, value, ex=max(1, int(ttl)))
+
+
+class TripCache:
+    """Serialized trips responses keyed by user, version and request.
+
+    Each user has a random version token that is part of every key.
+    Writes replace the token, so all of the user's cached responses are
+    invalidated at once without having to find them. A read that started
+    before the write stores its result under the old token, where it is
+    never read again.
+    """
+
+    def __init__(self, store, ttl: float):
+        self.store = store
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _version_key(self, user_id: str) -> str:
+        return f"trips:{user_id}:version"
+
+    async def key(self, user_id: str, request_key: str) -> str:
+        """Key for a response under the user's current version token."""
+        version = await self.store.get(self._version_key(user_id))
+        if version is None:
+            version = await self.invalidate_user(user_id)
+        elif isinstance(version, bytes):
+            version = version.decode()
+        return f"trips:{user_id}:{version}:{request_key}"
+
+    async def invalidate_user(self, user_id: str) -> str:
+        """Drop every cached response for the user."""
+        version = uuid.uuid4().hex
+        # The token outlives the entries that use it
+        await self.store.set(
+            self._version_key(user_id), version.encode(), self.ttl * 2
+        )
+        return version
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.store.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.store.set(key, value, self.ttl)
+
+
+_trip_cache: Optional[TripCache] = None
+
+
+def create_trip_cache() -> TripCache:
+    """Use Redis when TRIP_CACHE_URL is set, else an in-process store."""
+    if TRIP_CACHE_URL:
+        # Only needed when a Redis-compatible server is configured
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "TRIP_CACHE_URL is set but the redis package is not installed"
+            ) from e
+
+        store = RedisTripStore(redis.asyncio.from_url(TRIP_CACHE_URL))
+    else:
+        store = MemoryTripStore(TRIP_CACHE_MAX_BYTES)
+    return TripCache(store, TRIP_CACHE_TTL)
+
+
+async def start_trip_cache() -> TripCache:
+    """Create the trips cache. Called from the app lifespan."""
+    global _trip_cache
+    if _trip_cache is None:
+        _trip_cache = create_trip_cache()
+    return _trip_cache
+
+
+async def close_trip_cache() -> None:
+    """Close the Redis connection pool, if the cache has one."""
+    global _trip_cache
+    if _trip_cache is not None:
+        if isinstance(_trip_cache.store, RedisTripStore):
+            await _trip_cache.store.client.aclose()
+        _trip_cache = None
+
+
+def get_trip_cache() -> TripCache:
+    """Return the trips cache, creating it if the lifespan has not run."""
+    global _trip_cache
+    if _trip_cache is None:
+        _trip_cache = create_trip_cache()
+    return _trip_cache
@@ -1,6 +1,11 @@
-from models.models import Trip, ItineraryItem, Activity
-from datetime import datetime
-from typing import List
+from models.models import Trip, ItineraryItem, ItineraryItemDict, Activity
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from pydantic import TypeAdapter
+from uuid import UUID
+import base64
+import hashlib
+import json
 
 
 def create_trip_data(
@@ -38,6 +43,55 @@ def create_trip_data(
     return trip
 
 
+def group_activities_by_trip(
+    activities: Iterable[dict],
+) -> Dict[str, List[dict]]:
+    """Group activity rows by trip_id, keeping their original order."""
+    grouped: Dict[str, List[dict]] = {}
+    for activity in activities:
+        grouped.setdefault(activity["trip_id"], []).append(activity)
+    return grouped
+
+
+def diff_activities(
+    stored: Iterable[dict], updated: Iterable[dict]
+) -> Tuple[List[dict], List[int]]:
+    """Changes that turn the stored activities into the updated ones.
+
+    Activities are matched on their itinerary item id. Returns the rows
+    to insert or update, and the ids of stored rows to delete. Unchanged
+    rows appear in neither. If ids repeat on either side, rows cannot be
+    matched, so every stored row is deleted and every updated row
+    reinserted.
+    """
+    columns = Activity.model_fields.keys()
+    stored_by_id = {}
+    duplicate_ids = False
+    for activity in stored:
+        if activity["id"] in stored_by_id:
+            duplicate_ids = True
+        stored_by_id[activity["id"]] = {
+            column: activity.get(column) for column in columns
+        }
+
+    rows = []
+    updated_ids: Set[int] = set()
+    for activity in updated:
+        if activity["id"] in updated_ids:
+            duplicate_ids = True
+        updated_ids.add(activity["id"])
+        rows.append({column: activity.get(column) for column in columns})
+
+    if duplicate_ids:
+        return rows, list(stored_by_id)
+
+    upserts = [row for row in rows if stored_by_id.get(row["id"]) != row]
+    deleted_ids = [
+        item_id for item_id in stored_by_id if item_id not in updated_ids
+    ]
+    return upserts, deleted_ids
+
+
 def activity_to_itinerary(activity: dict) -> ItineraryItem:
     return ItineraryItem(
         title=activity.get("title", ""),
@@ -87,3 +141,118 @@ def itinerary_to_activity(itinerary: ItineraryItem) -> Activity:
         latitude=itinerary.latitude,
         longitude=itinerary.longitude,
     )
+
+
+# Validates a whole itinerary of plain dicts in one call
+itinerary_adapter = TypeAdapter(List[ItineraryItemDict])
+
+
+def activities_to_itineraries(
+    activities: Iterable[dict],
+) -> List[ItineraryItemDict]:
+    """Convert DB activity rows to API itinerary dicts in bulk.
+
+    Same mapping and defaults as activity_to_itinerary, but the rows are
+    validated once as a list and no model is built per row.
+    """
+    return itinerary_adapter.validate_python(
+        [
+            {
+                "title": activity.get("title", ""),
+                "transport": activity.get("transport", False),
+                "start": activity.get("start", ""),
+                "end": activity.get("end", ""),
+                "description": activity.get("description", ""),
+                "price": activity.get("price", 0.0),
+                "theme": activity.get("theme", ""),
+                "transportMode": activity.get("transport_mode", None),
+                "requires_booking": activity.get("requires_booking", False),
+                "booking_url": activity.get("booking_url", None),
+                "weather": activity.get("weather", None),
+                "temperature": activity.get("temperature", None),
+                "image_link": (
+                    activity["image_link"].split(",")
+                    if activity.get("image_link")
+                    else []
+                ),
+                "duration": activity.get("duration", 0),
+                "id": activity.get("id", 0),
+                "latitude": activity.get("latitude", None),
+                "longitude": activity.get("longitude", None),
+            }
+            for activity in activities
+        ]
+    )
+
+
+def itineraries_to_activities(items: Iterable[ItineraryItem]) -> List[dict]:
+    """Convert validated itinerary items to DB activity rows in bulk.
+
+    The items were validated on the way in, so their fields are mapped
+    straight into row dicts instead of through an Activity model.
+    """
+    return [
+        {
+            "title": item.title,
+            "start": item.start,
+            "end": item.end,
+            "description": item.description,
+            "price": item.price,
+            "theme": item.theme,
+            "transport_mode": item.transportMode,
+            "transport": item.transport,
+            "requires_booking": item.requires_booking,
+            "image_link": (
+                ",".join(item.image_link) if item.image_link else None
+            ),
+            "duration": item.duration,
+            "weather": item.weather,
+            "temperature": item.temperature,
+            "id": item.id,
+            "booking_url": item.booking_url,
+            "longitude": item.longitude,
+            "latitude": item.latitude,
+        }
+        for item in items
+    ]
+
+
+def encode_trips_cursor(trip: dict) -> str:
+    """Opaque cursor pointing just after `trip` in date_created order."""
+    position = [trip["date_created"], str(trip["trip_id"])]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_trips_cursor(cursor: str) -> Tuple[str, str]:
+    """Return the (date_created, trip_id) a cursor points after.
+
+    Both parts are validated since they end up in a PostgREST filter.
+    Raises ValueError for anything that is not a cursor we issued.
+    """
+    try:
+        date_created, trip_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return date.fromisoformat(date_created).isoformat(), str(
+            UUID(trip_id)
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False